@@ -1,62 +1,72 @@
-
-from dsl.dsl import *
+from dsl.dsl import DSL, program
 from agents.perception_agent import PerceptionAgent
 from agents.traffic_manager_agent import TrafficManagerAgent
 from agents.reroute_agent import RerouteAgent
 from agents.ems_agent import EMSAgent
-import random
 
 class AutonomousDriving:
-    def __init__(self, llm, seed=None, num_events=10):
-        self.llm = llm
-        self.seed = seed
-        self.num_events = num_events
-        self.perception_agent = PerceptionAgent(llm=self.llm)
-        self.traffic_manager_agent = TrafficManagerAgent(llm=self.llm)
-        self.reroute_agent = RerouteAgent(llm=self.llm)
-        self.ems_agent = EMSAgent(llm=self.llm)
-        self._setup_environment()
-
-    def _setup_environment(self):
-        if self.seed is not None:
-            random.seed(self.seed)
-
-    def _generate_event(self):
-        # simplified event generation
-        return {"event": "traffic incident"}
-
-    def run_simulation(self):
-        for i in range(self.num_events):
-            event = self._generate_event()
-            print(f"Cycle {i+1}/{self.num_events}: Processing event: {event}")
-            self.process_event(event)
-
-    def process_event(self, event):
-        perception_task = Task(
-            agent=self.perception_agent,
-            instruction="Analyze the event and identify the type of incident."
-        )
-        traffic_manager_task = Task(
-            agent=self.traffic_manager_agent,
-            instruction="Based on the incident type, determine the necessary actions."
-        )
-        reroute_task = Task(
-            agent=self.reroute_agent,
-            instruction="Suggest a new route to avoid the incident."
-        )
-        ems_task = Task(
-            agent=self.ems_agent,
-            instruction="If necessary, dispatch emergency services."
+    def __init__(self, dsl: DSL, llm_delay_ms: int = 0, use_cache: bool = True, llm=None):
+        self.dsl = dsl
+        self.llm_delay_ms = llm_delay_ms
+        self.use_cache = use_cache
+        self.llm = llm  # e.g. integrations.mock_llm.MockLLM; overrides the fixed-delay stub
+        self._setup_llm()
+        self._setup_agents()
+
+    def _setup_llm(self):
+        if self.llm is not None:
+            self.dsl.use_llm(self.llm, use_cache=self.use_cache)
+            return
+        import time
+        def _llm(p, role=None):
+            if self.llm_delay_ms > 0:
+                time.sleep(self.llm_delay_ms / 1000.0)
+            return f"[{role}]OK:{p[-16:]}"
+        self.dsl.use_llm(_llm, use_cache=self.use_cache)
+
+    def _setup_agents(self):
+        self.perception_agent = PerceptionAgent(self.dsl)
+        self.traffic_manager_agent = TrafficManagerAgent(self.dsl)
+        self.reroute_agent = RerouteAgent(self.dsl)
+        self.ems_agent = EMSAgent(self.dsl)
+
+    def _mk_prompt(self, observation: str) -> str:
+        return (
+            "You are a driving ops agent. Output minimal JSON.\n"
+            "Keys: kind, severity, segment, action.\n"
+            f"{observation}"
         )
 
-        # Define the workflow for event processing
-        perception_task.set_downstream(traffic_manager_task)
-        traffic_manager_task.set_downstream(reroute_task)
-        traffic_manager_task.set_downstream(ems_task)
+    def handle_collision(self, segment: str):
+        obs = f"Collision detected on {segment}"
+        det = self.dsl.gen("collision", prompt=self._mk_prompt(obs), agent=self.perception_agent).with_regex(r".*").schedule()
+        rr = self.dsl.gen("reroute", prompt=f"Reroute vehicles around {segment}", agent=self.reroute_agent).with_regex(r".*").schedule()
+        ems = self.dsl.gen("ems", prompt=f"Dispatch EMS to {segment}", agent=self.ems_agent).with_regex(r".*").schedule()
+        return [det, rr, ems]
+
+    def handle_congestion(self, segment: str):
+        obs = f"Heavy congestion on {segment}"
+        plan = self.dsl.gen("congestion", prompt=self._mk_prompt(obs), agent=self.traffic_manager_agent).with_regex(r".*").schedule()
+        return [plan]
+
+@program
+def driving_demo(dsl: DSL, *, ticks:int=50, p_collision:float=0.02, p_congestion:float=0.05, seed:int=7, llm_delay_ms:int=0, use_cache:bool=True, outdir: str | None = None, llm=None):
+    import random
+    random.seed(seed)
+
+    ad = AutonomousDriving(dsl, llm_delay_ms=llm_delay_ms, use_cache=use_cache, llm=llm)
+    all_tasks = []
+
+    for t in range(ticks):
+        if random.random() < p_collision:
+            segment = f"S{random.randint(1, 6)}"
+            all_tasks.extend(ad.handle_collision(segment))
+        if random.random() < p_congestion:
+            segment = f"S{random.randint(1, 6)}"
+            all_tasks.extend(ad.handle_congestion(segment))
 
-        # Start the workflow
-        perception_task.run()
+    summary = dsl.join(all_tasks)
+    if outdir:
+        dsl.metrics.write_csv(outdir)
 
-def driving_demo(llm, seed=None):
-    simulation = AutonomousDriving(llm, seed)
-    simulation.run_simulation()
+    return {"done": True, "summary": summary}
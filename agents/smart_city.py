@@ -7,14 +7,18 @@ from agents.ems_agent import EMSAgent
 from agents.traffic_incident_agent import TrafficIncidentAgent
 
 class SmartCity:
-    def __init__(self, dsl: DSL, llm_delay_ms: int = 0, use_cache: bool = True):
+    def __init__(self, dsl: DSL, llm_delay_ms: int = 0, use_cache: bool = True, llm=None):
         self.dsl = dsl
         self.llm_delay_ms = llm_delay_ms
         self.use_cache = use_cache
+        self.llm = llm  # e.g. integrations.mock_llm.MockLLM; overrides the fixed-delay stub
         self._setup_llm()
         self._setup_agents()
 
     def _setup_llm(self):
+        if self.llm is not None:
+            self.dsl.use_llm(self.llm, use_cache=self.use_cache)
+            return
         import time
         def _llm(p, role=None):
             if self.llm_delay_ms > 0:
@@ -54,11 +58,11 @@ class SmartCity:
         return [det]
 
 @program
-def city_demo(dsl: DSL, *, ticks:int=60, p_fall:float=0.02, p_low_moisture:float=0.03, p_traffic_incident:float=0.01, seed:int=7, llm_delay_ms:int=0, use_cache:bool=True, outdir: str | None = None):
+def city_demo(dsl: DSL, *, ticks:int=60, p_fall:float=0.02, p_low_moisture:float=0.03, p_traffic_incident:float=0.01, seed:int=7, llm_delay_ms:int=0, use_cache:bool=True, outdir: str | None = None, llm=None):
     import random
     random.seed(seed)
 
-    city = SmartCity(dsl, llm_delay_ms=llm_delay_ms, use_cache=use_cache)
+    city = SmartCity(dsl, llm_delay_ms=llm_delay_ms, use_cache=use_cache, llm=llm)
     all_tasks = []
 
     for t in range(ticks):
@@ -3,6 +3,7 @@ import os, argparse, json
 import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
+from utils.event_store import read_events
 
 def moving_average(x: pd.Series, w: int) -> pd.Series:
     if w <= 1:
@@ -10,7 +11,7 @@ def moving_average(x: pd.Series, w: int) -> pd.Series:
     return x.rolling(window=w, min_periods=1, center=False).mean()
 
 def load_events(csv_path: str) -> pd.DataFrame:
-    df = pd.read_csv(csv_path)
+    df = read_events(csv_path)  # .csv, or memory-mapped .arrow / .parquet
     if "timestamp" not in df.columns:
         raise ValueError("CSV must contain a 'timestamp' column")
     df["_time"] = pd.to_datetime(df["timestamp"], utc=True, errors="coerce")
@@ -4,10 +4,11 @@ import argparse
 import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
+from utils.event_store import read_events
 from datetime import timedelta
 
 def load_events(csv_path: str) -> pd.DataFrame:
-    df = pd.read_csv(csv_path)
+    df = read_events(csv_path)  # .csv, or memory-mapped .arrow / .parquet
     df["timestamp"] = pd.to_datetime(df["timestamp"], unit="s", utc=True, errors="coerce")
     df = df.dropna(subset=["timestamp"]).sort_values("timestamp")
     return df
@@ -1,6 +1,8 @@
 # backend/api_routes.py
 import asyncio
+import logging
 from fastapi import APIRouter, Depends
+from fastapi.responses import Response
 from backend.data_models import (
     AutonomousDrivingEvent,
     TrafficData,
@@ -27,6 +29,7 @@ from agents.safety_agent import SafetyAgent
 from agents.traffic_incident_agent import TrafficIncidentAgent
 from backend.dependencies import (
     get_dsl_instance,
+    get_runtime_stats,
     get_traffic_monitor_agent,
     get_weather_agent,
     get_parking_agent,
@@ -34,6 +37,9 @@ from backend.dependencies import (
     get_traffic_incident_agent,
 )
 from backend.websocket_manager import manager
+from backend.prometheus import CONTENT_TYPE as PROMETHEUS_CONTENT_TYPE, RuntimeStats, render_metrics
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
@@ -43,6 +49,12 @@ def health():
     return {"ok": True}
 
 
+# async so it runs on the event loop, the only thread that mutates ConnectionManager state
+@router.get("/metrics")
+async def metrics(dsl: DSL = Depends(get_dsl_instance), stats: RuntimeStats = Depends(get_runtime_stats)):
+    return Response(render_metrics(dsl, stats, manager), media_type=PROMETHEUS_CONTENT_TYPE)
+
+
 @router.post("/events/autonomous_driving")
 async def autonomous_driving(evt: AutonomousDrivingEvent):
     payload = evt.dict()
@@ -51,7 +63,7 @@ async def autonomous_driving(evt: AutonomousDrivingEvent):
         "payload": payload,
         "title": "Autonomous Driving Event",
     }
-    print(f"Broadcasting event: {message}")
+    logger.debug("Broadcasting %s event", message["type"])
     await manager.broadcast(message)
     return {"status": "received"}
 
@@ -66,7 +78,7 @@ async def traffic_monitor(
         "payload": data.dict(),
         "title": "Traffic Monitor",
     }
-    print(f"Broadcasting event: {message}")
+    logger.debug("Broadcasting %s event", message["type"])
     await manager.broadcast(message)
     return {"status": "success"}
 
@@ -79,7 +91,7 @@ async def weather_alert(alert: WeatherAlert, weather_agent: WeatherAgent = Depen
         "payload": alert.dict(),
         "title": "Weather Alert",
     }
-    print(f"Broadcasting event: {message}")
+    logger.debug("Broadcasting %s event", message["type"])
     await manager.broadcast(message)
     asyncio.create_task(master_workflow_chain_task(dsl, alert.dict()))
     return {"status": "alert triggered"}
@@ -93,7 +105,7 @@ async def parking_update(data: ParkingData, parking_agent: ParkingAgent = Depend
         "payload": data.dict(),
         "title": "Parking Update",
     }
-    print(f"Broadcasting event: {message}")
+    logger.debug("Broadcasting %s event", message["type"])
     await manager.broadcast(message)
     return {"status": "updated"}
 
@@ -106,7 +118,7 @@ async def safety_monitor(data: SafetyData, safety_agent: SafetyAgent = Depends(g
         "payload": data.dict(),
         "title": "Safety Monitor",
     }
-    print(f"Broadcasting event: {message}")
+    logger.debug("Broadcasting %s event", message["type"])
     await manager.broadcast(message)
     return {"status": "monitoring"}
 
@@ -148,7 +160,7 @@ async def traffic_incident(
         "payload": incident.dict(),
         "title": "Traffic Incident",
     }
-    print(f"Broadcasting event: {message}")
+    logger.debug("Broadcasting %s event", message["type"])
     await manager.broadcast(message)
     asyncio.create_task(traffic_incident_workflow_task(dsl, incident.dict()))
     return {"status": "incident reported"}
\ No newline at end of file
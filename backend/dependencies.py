@@ -14,10 +14,33 @@ from agents.sanitation_agent import SanitationAgent
 from agents.parking_agent import ParkingAgent
 from agents.safety_agent import SafetyAgent
 from backend.websocket_manager import manager as websocket_manager
+from backend.prometheus import RuntimeStats
+from runtime.eventlog import EventLogWriter, open_worker_log
+from runtime.transport import UnixSocketTransport, ensure_broker
+import os
 
 llm = get_llm()
-dsl_instance = DSL(workers=8)
+# with a transport several workers share EVENTLOG_DIR: each logs its own publishes under worker-<n>/
+event_log = None
+if os.getenv("EVENTLOG_DIR"):
+    event_log = open_worker_log(os.environ["EVENTLOG_DIR"]) if os.getenv("EVENTBUS_SOCKET") else EventLogWriter(os.environ["EVENTLOG_DIR"])
+dsl_instance = DSL(
+    workers=8,
+    keep_events=False,  # long-running: histograms and rolling windows only
+    bus_partitions=int(os.getenv("EVENTBUS_PARTITIONS", "4")),
+    bus_overflow=os.getenv("EVENTBUS_OVERFLOW", "drop_newest"),
+    spill_dir=os.getenv("EVENTBUS_SPILL_DIR") or None,
+    event_log=event_log,
+)
 dsl_instance.use_llm(llm)
+# several uvicorn workers: share events (and WS broadcasts, see main.py) through a local broker
+bus_transport = None
+if os.getenv("EVENTBUS_SOCKET"):
+    if os.getenv("EVENTBUS_BROKER", "auto") == "auto":
+        ensure_broker(os.environ["EVENTBUS_SOCKET"])
+    bus_transport = UnixSocketTransport(os.environ["EVENTBUS_SOCKET"]).attach(dsl_instance.bus)
+runtime_stats = RuntimeStats()
+dsl_instance.add_observer(runtime_stats)
 
 traffic_manager_agent = TrafficManagerAgent(dsl_instance=dsl_instance)
 traffic_monitor_agent = TrafficMonitorAgent(dsl_instance=dsl_instance)
@@ -76,4 +99,7 @@ def get_safety_agent():
     return safety_agent
 
 def get_websocket_manager():
-    return websocket_manager
\ No newline at end of file
+    return websocket_manager
+
+def get_runtime_stats():
+    return runtime_stats
@@ -85,25 +85,29 @@ async def run_simulation_workflow(dsl: DSL, simulation_name: str):
         from agents.smart_city import SmartCity
         city = SmartCity(dsl, llm_delay_ms=0, use_cache=True)
         
-        # Subscribe to all events and broadcast them
-        def event_handler(event):
-            asyncio.create_task(get_websocket_manager().broadcast({
+        # Subscribe to all events and broadcast them; the bus runs this coroutine
+        # on our loop, so it is safe to call from the bus worker threads
+        async def event_handler(event):
+            await get_websocket_manager().broadcast({
                 "type": "simulation_event",
                 "payload": event,
                 "title": "Smart City Simulation"
-            }))
+            })
         
-        # Subscribe to DSL's event bus
-        dsl.on("*", event_handler)
-        
-        # Run simulation with default parameters
-        city_demo_task = dsl.gen(
-            name="city_demo",
-            prompt="Running smart city simulation",
-            agent="simulation_agent"
-        ).schedule()
-        
-        await asyncio.to_thread(dsl.join, [city_demo_task])
+        # Subscribe to DSL's event bus for this run only; otherwise every run adds
+        # another handler and each event gets broadcast once per past run
+        dsl.on("#", event_handler, loop=asyncio.get_running_loop())
+        try:
+            # Run simulation with default parameters
+            city_demo_task = dsl.gen(
+                name="city_demo",
+                prompt="Running smart city simulation",
+                agent="simulation_agent"
+            ).schedule()
+
+            await asyncio.to_thread(dsl.join, [city_demo_task])
+        finally:
+            dsl.bus.unsubscribe("#", event_handler)
     else:
         await broadcast_message_task(dsl, {
             "type": "error",
@@ -111,106 +115,3 @@ async def run_simulation_workflow(dsl: DSL, simulation_name: str):
             "payload": {"simulation_name": simulation_name}
         })
 
-
-@dsl.task
-def autonomous_driving_workflow_task(event: dict):
-    """
-    A workflow task for autonomous driving.
-    """
-    print(
-        f"Executing autonomous driving workflow for event: {event}"
-    )
-    # Simulate autonomous driving logic
-    time.sleep(2)
-    broadcast_message_task.run(
-        {
-            "type": "autonomous_driving",
-            "title": "Autonomous Driving Task Updated",
-            "payload": event,
-        }
-    )
-
-
-@dsl.task
-def parking_update_workflow_task(event: dict):
-    """
-    A workflow task for parking updates.
-    """
-    print(f"Executing parking update workflow for event: {event}")
-    # Simulate parking update logic
-    time.sleep(1)
-    broadcast_message_task.run(
-        {
-            "type": "parking_update",
-            "title": "Parking Update",
-            "payload": event,
-        }
-    )
-
-
-@dsl.task
-def safety_inspection_workflow_task(event: dict):
-    """
-    A workflow task for safety inspections.
-    """
-    print(f"Executing safety inspection workflow for event: {event}")
-    # Simulate safety inspection logic
-    time.sleep(3)
-    broadcast_message_task.run(
-        {
-            "type": "safety_inspection",
-            "title": "Safety Inspection Update",
-            "payload": event,
-        }
-    )
-
-
-@dsl.task
-def weather_alert_workflow_task(event: dict):
-    """
-    A workflow task for weather alerts.
-    """
-    print(f"Executing weather alert workflow for event: {event}")
-    # Simulate weather alert logic
-    time.sleep(1)
-    broadcast_message_task.run(
-        {
-            "type": "weather_alert",
-            "title": "Weather Alert",
-            "payload": event,
-        }
-    )
-
-
-@dsl.task
-def run_simulation_workflow(task_name: str, event: dict):
-    """Runs a specified simulation and broadcasts its events."""
-    if simulation_name == "smart_city":
-        from agents.smart_city import SmartCity
-        city = SmartCity(dsl, llm_delay_ms=0, use_cache=True)
-        
-        # Subscribe to all events and broadcast them
-        def event_handler(event):
-            asyncio.create_task(get_websocket_manager().broadcast({
-                "type": "simulation_event",
-                "payload": event,
-                "title": "Smart City Simulation"
-            }))
-        
-        # Subscribe to DSL's event bus
-        dsl.on("*", event_handler)
-        
-        # Run simulation with default parameters
-        city_demo_task = dsl.gen(
-            name="city_demo",
-            prompt="Running smart city simulation",
-            agent="simulation_agent"
-        ).schedule()
-        
-        await asyncio.to_thread(dsl.join, [city_demo_task])
-    else:
-        await broadcast_message_task(dsl, {
-            "type": "error",
-            "title": "Unknown Simulation",
-            "payload": {"simulation_name": simulation_name}
-        })
\ No newline at end of file
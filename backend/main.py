@@ -12,6 +12,9 @@ sys.path.insert(0, project_root)
 
 from backend.api_routes import router
 from backend.websocket_manager import manager
+import asyncio
+from backend.dependencies import bus_transport, dsl_instance
+from core.llm import startup_llm_client, shutdown_llm_client
 
 # Create FastAPI app
 app = FastAPI(title="Multi-Agent DSL Backend", version="1.0.0")
@@ -28,6 +31,24 @@ app.add_middleware(
 # Include API router
 app.include_router(router)
 
+
+@app.on_event("startup")
+async def _startup():
+    # one pooled keep-alive client for all LLM report calls
+    await startup_llm_client()
+    # live 1s/1m/5m windows for dashboards
+    if bus_transport is not None:
+        manager.attach_transport(bus_transport, asyncio.get_running_loop())
+    manager.start_metrics_push(dsl_instance.metrics.rolling, interval=float(os.getenv("METRICS_PUSH_INTERVAL_S", "1.0")))
+
+
+@app.on_event("shutdown")
+async def _shutdown():
+    await manager.stop_metrics_push()
+    # stops the bus workers and closes the event log (committing buffered records) and transport
+    await asyncio.to_thread(dsl_instance.bus.shutdown)
+    await shutdown_llm_client()
+
 @app.websocket("/ws")
 async def ws_endpoint(websocket: WebSocket):
     await manager.connect(websocket)
@@ -37,16 +58,30 @@ async def ws_endpoint(websocket: WebSocket):
             data = await websocket.receive_text()
             try:
                 message = json.loads(data)
-                if message.get("type") == "pong":
+                kind = message.get("type") if isinstance(message, dict) else None
+                if kind == "pong":
                     manager.update_last_pong(websocket)
+                elif kind in ("subscribe", "unsubscribe"):
+                    # {"type": "subscribe", "topics": ["traffic_monitor"], "locations": ["A1"]}
+                    change = manager.subscribe if kind == "subscribe" else manager.unsubscribe
+                    try:
+                        filters = change(websocket, topics=message.get("topics"), locations=message.get("locations"))
+                    except ValueError as e:
+                        manager.send_to(websocket, {"type": "error", "payload": {"request": kind, "detail": str(e)}})
+                    else:
+                        if filters is not None:
+                            manager.send_to(websocket, {"type": f"{kind}d", "payload": filters})
             except json.JSONDecodeError:
                 print(f"Received non-JSON message: {data}")
 
     except WebSocketDisconnect:
-        manager.disconnect(websocket)
         print("connection closed")
+    finally:
+        # also on unexpected errors, so no stale client stays in manager.active
+        manager.disconnect(websocket)
 
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    # permessage-deflate compresses WebSocket frames for clients that offer it
+    uvicorn.run(app, host="0.0.0.0", port=8000, ws_per_message_deflate=os.getenv("WS_DEFLATE", "1") != "0")
\ No newline at end of file
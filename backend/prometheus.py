@@ -0,0 +1,171 @@
+# backend/prometheus.py
+import math
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from runtime.scheduler import SchedulerObserver
+from utils.counters import ShardedCounter, ShardedHistogram
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class RuntimeStats(SchedulerObserver):
+    """
+    Scheduler observer feeding /metrics. Every hook only bumps a per-thread cell,
+    so worker threads never contend with each other or with a scrape.
+    """
+
+    def __init__(self):
+        self.submitted = ShardedCounter()
+        self.completed = ShardedCounter()
+        self.busy_workers = ShardedCounter()
+        self.cache_lookups = ShardedCounter()
+        self.cache_full_hits = ShardedCounter()
+        self.cache_partial_hits = ShardedCounter()
+        self.llm_latency_ms: Dict[str, ShardedHistogram] = {}
+        self.llm_errors: Dict[str, ShardedCounter] = {}
+        self._roles_lock = threading.Lock()
+
+    def _role(self, task) -> Tuple[ShardedHistogram, ShardedCounter]:
+        role = str(getattr(task.agent, "role", task.agent))
+        hist = self.llm_latency_ms.get(role)
+        if hist is None:
+            with self._roles_lock:  # first call for a role only
+                hist = self.llm_latency_ms.setdefault(role, ShardedHistogram())
+                self.llm_errors.setdefault(role, ShardedCounter())
+        return hist, self.llm_errors[role]
+
+    def on_submit(self, task, prefix_len):
+        self.submitted.add()
+
+    def on_dequeue(self, task):
+        self.busy_workers.add(1)
+
+    def on_cache_result(self, task, prefix_len, full_hit):
+        self.cache_lookups.add()
+        if full_hit:
+            self.cache_full_hits.add()
+        elif prefix_len > 0:
+            self.cache_partial_hits.add()
+
+    def on_llm_end(self, task, attempt, output, error):
+        hist, errors = self._role(task)
+        spans = task.trace.llm_spans
+        if spans:
+            a, b = spans[-1]
+            hist.observe((b - a) * 1000.0)
+        if error is not None:
+            errors.add()
+
+    def on_complete(self, task, result, cache_hit):
+        self.completed.add()
+
+    def on_release(self, task):
+        self.busy_workers.add(-1)
+
+
+def _esc(v: Any) -> str:
+    return str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels: Optional[Dict[str, Any]]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_esc(v)}"' for k, v in labels.items()) + "}"
+
+
+def _value(v: float) -> str:
+    """Sample value at full precision (":g" keeps 6 digits, so big counters would move in steps)."""
+    if isinstance(v, int):  # incl. bool
+        return str(int(v))
+    v = float(v)
+    if math.isnan(v):
+        return "NaN"
+    if math.isinf(v):
+        return "+Inf" if v > 0 else "-Inf"
+    return repr(v)
+
+
+class _Writer:
+    def __init__(self):
+        self.lines: List[str] = []
+
+    def metric(self, name: str, mtype: str, help_text: str, samples: Iterable[Tuple[Optional[Dict[str, Any]], float]]):
+        self.lines.append(f"# HELP {name} {help_text}")
+        self.lines.append(f"# TYPE {name} {mtype}")
+        for labels, value in samples:
+            self.lines.append(f"{name}{_labels(labels)} {_value(value)}")
+
+    def histogram(self, name: str, help_text: str, series: Iterable[Tuple[Optional[Dict[str, Any]], ShardedHistogram]]):
+        self.lines.append(f"# HELP {name} {help_text}")
+        self.lines.append(f"# TYPE {name} histogram")
+        for labels, hist in series:
+            buckets, total, count = hist.snapshot()
+            for bound, cum in buckets:
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                self.lines.append(f"{name}_bucket{_labels({**(labels or {}), 'le': le})} {cum}")
+            self.lines.append(f"{name}_sum{_labels(labels)} {_value(total)}")
+            self.lines.append(f"{name}_count{_labels(labels)} {count}")
+
+    def text(self) -> str:
+        return "\n".join(self.lines) + "\n"
+
+
+def render_metrics(dsl, stats: RuntimeStats, ws_manager) -> str:
+    """Prometheus text exposition (format 0.0.4) of scheduler, cache, EventBus, WebSocket and LLM state."""
+    w = _Writer()
+    sched = dsl.scheduler
+    w.metric("dsl_scheduler_queue_depth", "gauge", "Tasks waiting in the scheduler queue.", [(None, sched.queue_depth())])
+    w.metric("dsl_scheduler_workers", "gauge", "Scheduler worker threads.", [(None, sched.num_workers)])
+    w.metric("dsl_scheduler_busy_workers", "gauge", "Workers currently executing a task.", [(None, stats.busy_workers.value())])
+    w.metric("dsl_scheduler_observer_errors_total", "counter", "Scheduler observer hooks that raised.",
+             [(None, sched.observer_errors)])
+    w.metric("dsl_tasks_submitted_total", "counter", "Tasks submitted to the scheduler.", [(None, stats.submitted.value())])
+    w.metric("dsl_tasks_completed_total", "counter", "Tasks completed by the scheduler.", [(None, stats.completed.value())])
+
+    lookups = stats.cache_lookups.value()
+    full = stats.cache_full_hits.value()
+    partial = stats.cache_partial_hits.value()
+    w.metric("dsl_cache_entries", "gauge", "Keys held by the prompt cache.", [(None, len(dsl.cache) if hasattr(dsl.cache, "__len__") else 0)])
+    w.metric("dsl_cache_lookups_total", "counter", "Prompt cache lookups.", [(None, lookups)])
+    w.metric("dsl_cache_hits_total", "counter", "Prompt cache hits by kind.", [({"kind": "full"}, full), ({"kind": "partial"}, partial)])
+    w.metric("dsl_cache_hit_ratio", "gauge", "Lifetime cache hit ratio by kind.",
+             [({"kind": "full"}, full / lookups if lookups else 0.0), ({"kind": "partial"}, partial / lookups if lookups else 0.0)])
+
+    bus = dsl.bus.stats()
+    cap = bus["queue_capacity"] or 1
+    w.metric("dsl_eventbus_queue_depth", "gauge", "Events waiting for delivery.", [(None, bus["queue_depth"])])
+    w.metric("dsl_eventbus_queue_fill_ratio", "gauge", "EventBus queue depth / capacity.", [(None, bus["queue_depth"] / cap)])
+    w.metric("dsl_eventbus_published_total", "counter", "Events accepted by the EventBus.", [(None, bus["published"])])
+    w.metric("dsl_eventbus_dropped_total", "counter", "Events lost to the EventBus overflow policy.", [(None, bus["dropped"])])
+    w.metric("dsl_eventbus_overflow_total", "counter", "EventBus publish outcomes by kind.",
+             [({"outcome": k}, v) for k, v in sorted(bus.get("outcomes", {}).items())])
+    w.metric("dsl_eventbus_spill_backlog_bytes", "gauge", "Spilled bytes not yet replayed.", [(None, bus.get("spill_backlog_bytes", 0))])
+    w.metric("dsl_eventbus_subscriber_errors_total", "counter", "Exceptions raised by EventBus subscribers.",
+             [(None, bus.get("subscriber_errors", 0))])
+    parts = bus.get("partitions", [])
+    w.metric("dsl_eventbus_partition_queue_depth", "gauge", "Events waiting per EventBus partition.",
+             [({"partition": p["partition"]}, p["queue_depth"]) for p in parts])
+    w.metric("dsl_eventbus_partition_delivered_total", "counter", "Events delivered per EventBus partition.",
+             [({"partition": p["partition"]}, p["delivered"]) for p in parts])
+    w.metric("dsl_eventbus_partition_dropped_total", "counter", "Events dropped per EventBus partition.",
+             [({"partition": p["partition"]}, p["dropped"]) for p in parts])
+
+    ws = ws_manager.stats()
+    w.metric("dsl_websocket_clients", "gauge", "Connected WebSocket clients.", [(None, ws["clients"])])
+    w.metric("dsl_websocket_degraded_clients", "gauge", "Clients currently shedding messages.", [(None, ws["degraded"])])
+    w.metric("dsl_websocket_send_queue_max", "gauge", "Deepest per-client send queue.", [(None, ws["queued_max"])])
+    w.metric("dsl_websocket_slow_clients_total", "counter", "Clients that overflowed their send queue, by action.",
+             [({"action": "dropped"}, ws["slow_dropped"]), ({"action": "downgraded"}, ws["slow_downgraded"])])
+    w.metric("dsl_websocket_messages_skipped_total", "counter", "Messages not sent to degraded clients.", [(None, ws["messages_skipped"])])
+    w.metric("dsl_websocket_replay_buffered", "gauge", "Messages held for resuming clients.", [(None, ws["replay_buffered"])])
+    w.metric("dsl_websocket_reconnects_total", "counter", "Reconnects with a resume_from, by outcome.",
+             [({"outcome": "resumed"}, ws["resumed"]), ({"outcome": "resync"}, ws["resyncs"])])
+    w.histogram("dsl_websocket_broadcast_latency_ms", "Time to fan one broadcast out to all clients.",
+                [(None, ws_manager.broadcast_latency_ms)])
+
+    roles = sorted(stats.llm_latency_ms.items())
+    w.histogram("dsl_llm_latency_ms", "LLM call latency per agent role.", [({"role": r}, h) for r, h in roles])
+    w.metric("dsl_llm_errors_total", "counter", "LLM calls that raised, per agent role.",
+             [({"role": r}, stats.llm_errors[r].value()) for r, _ in roles])
+    return w.text()
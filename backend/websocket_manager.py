@@ -1,74 +1,533 @@
 # backend/websocket_manager.py
 import asyncio
+import json
+from collections import deque
+import logging
+import os
 import time
-from typing import List, Dict, Tuple
+from typing import Any, Callable, Deque, Iterable, List, Dict, Optional, Set, Tuple
 from fastapi import WebSocket
 
+from utils.counters import ShardedHistogram
+
+
+logger = logging.getLogger(__name__)
+
+# transport side channel carrying broadcasts between backend worker processes
+WS_BROADCAST_TOPIC = "$ws.broadcast"
+
+
+def encode_message(message: dict) -> str:
+    """The text frame for a message (same compact form Starlette's send_json produces)."""
+    return json.dumps(message, separators=(",", ":"), ensure_ascii=False)
+
+
+# wire encodings a client can negotiate (Sec-WebSocket-Protocol or ?encoding=)
+ENCODINGS = ("json", "msgpack")
+# {"type": "batch", "payload": [...]} with the array left open, in msgpack form
+_MSGPACK_BATCH_HEAD = b"\x82\xa4type\xa5batch\xa7payload"
+
+
+def with_seq(text: str, seq: int) -> str:
+    """Splice "seq" into an encoded JSON object without re-encoding it."""
+    return '{"seq":%d,%s' % (seq, text[1:]) if len(text) > 2 else '{"seq":%d}' % seq
+
+
+def _msgpack_array_header(n: int) -> bytes:
+    if n < 16:
+        return bytes((0x90 | n,))
+    if n < 1 << 16:
+        return b"\xdc" + n.to_bytes(2, "big")
+    return b"\xdd" + n.to_bytes(4, "big")
+
+
+class Frame:
+    """One outgoing message, serialized at most once per wire encoding (JSON always, msgpack on demand)."""
+    __slots__ = ("message", "text", "_packed")
+
+    def __init__(self, message: Optional[dict] = None, text: Optional[str] = None) -> None:
+        self.message = message
+        self.text = encode_message(message) if text is None else text
+        self._packed: Optional[bytes] = None
+
+    def packed(self) -> bytes:
+        if self._packed is None:
+            import msgpack
+            message = self.message if self.message is not None else json.loads(self.text)
+            self._packed = msgpack.packb(message, use_bin_type=True)
+        return self._packed
+
+
+def batch_text(frames: List[Frame]) -> str:
+    """{"type": "batch", "payload": [m1, m2, ...]} spliced from the already-encoded messages."""
+    return '{"type":"batch","payload":[' + ",".join(f.text for f in frames) + "]}"
+
+
+def batch_packed(frames: List[Frame]) -> bytes:
+    return _MSGPACK_BATCH_HEAD + _msgpack_array_header(len(frames)) + b"".join(f.packed() for f in frames)
+
+
+PING_FRAME = Frame({"type": "ping"})
+# payload fields that carry a message's location, checked in order
+LOCATION_FIELDS = ("location", "area", "zone")
+
+
+def message_location(message: dict) -> Optional[str]:
+    payload = message.get("payload")
+    if isinstance(payload, dict):
+        for field in LOCATION_FIELDS:
+            if payload.get(field) is not None:
+                return str(payload[field])
+    return None
+
+
+def _names(values: Optional[Iterable[str]]) -> Optional[Set[str]]:
+    """
+    Client filter list (or comma-separated string) -> set of names; "*" means no filter
+    (None). Raises ValueError for anything but a string or a list of strings.
+    """
+    if values is None:
+        return None
+    if isinstance(values, str):
+        values = values.split(",")
+    elif not isinstance(values, (list, tuple, set, frozenset)) or not all(isinstance(v, str) for v in values):
+        raise ValueError("expected a string or a list of strings")
+    names = {v.strip() for v in values if v.strip()}
+    return None if "*" in names else names
+
+
+class _Client:
+    """Per-connection state: a bounded queue of frames drained by its own writer task."""
+
+    def __init__(self, websocket: WebSocket, max_queue: int) -> None:
+        self.ws = websocket
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.last_pong = time.time()
+        self.writer: asyncio.Task | None = None
+        self.degraded = False
+        self.skipped = 0  # messages not queued while degraded
+        self.sent = 0
+        self.topics: Optional[Set[str]] = None     # None: every topic
+        self.locations: Optional[Set[str]] = None  # None: every location
+        self.encoding = "json"
+        self.coalesce_s = 0.0  # > 0: pending messages go out as one batch frame per interval
+        self.frames = 0        # wire frames written (< sent when coalescing)
+
 
 class ConnectionManager:
-    """Manages active WebSocket connections with heartbeat."""
+    """
+    Manages active WebSocket connections with heartbeat. Every client has a bounded
+    send queue and a writer task, so broadcast() only enqueues and never waits on a
+    socket. A client whose queue overflows is handled per `slow_client_policy`:
+    "drop" closes it (1013, try again later); "downgrade" empties its backlog and
+    only queues new messages while the queue is under half full, telling the client
+    how many it missed once it catches up.
 
-    def __init__(self, heartbeat_interval: int = 30, timeout: int = 60) -> None:
-        self.active: Dict[WebSocket, float] = {}
+    Clients may narrow what they receive to some message types ("topics") and
+    locations, at connect time (?topics=a,b&locations=x) or with subscribe /
+    unsubscribe messages. Filters are allow-lists: unsubscribing single topics or
+    locations while receiving all of them ("*") is rejected with an error frame.
+    Routing goes through a topic -> clients index, so a broadcast only touches
+    interested clients; messages without a location are not location-filtered.
+
+    Also negotiated at connect: the wire encoding, JSON text frames (default) or
+    MessagePack binary frames (subprotocol "msgpack" or ?encoding=msgpack; needs the
+    msgpack package), and coalescing (?coalesce_ms=N, default `coalesce_ms`), where
+    everything queued for the client within N ms is written as one
+    {"type": "batch", "payload": [...]} frame. Client -> server messages stay JSON text.
+
+    Every broadcast carries a "seq" that increases by one per message in this
+    process's stream (named by `epoch`, new on each start), and the last
+    `replay_size` messages of each topic are kept. A client starts with a
+    {"type": "hello", "payload": {"epoch", "seq"}} message; reconnecting with
+    ?epoch=E&resume_from=N gets the missed messages matching its filters as one
+    batch frame before any live traffic, or "resync": true in the hello when they
+    are no longer (or were never) buffered and it has to reload its state.
+    """
+
+    def __init__(self, heartbeat_interval: int = 30, timeout: int = 60,
+                 send_queue_size: int = 256, slow_client_policy: str = "downgrade",
+                 coalesce_ms: float = 0.0, replay_size: int = 256,
+                 unbuffered_topics: Iterable[str] = ("metrics",)) -> None:
+        if slow_client_policy not in ("drop", "downgrade"):
+            raise ValueError(f"unknown slow_client_policy {slow_client_policy!r}")
+        self.active: Dict[WebSocket, _Client] = {}
         self.heartbeat_interval = heartbeat_interval
         self.timeout = timeout
+        self.send_queue_size = send_queue_size
+        self.slow_client_policy = slow_client_policy
+        self.coalesce_ms = coalesce_ms
+        self.replay_size = replay_size
+        self.unbuffered_topics = frozenset(unbuffered_topics)  # periodic snapshots, not worth replaying
+        self.epoch = os.urandom(6).hex()
+        self.seq = 0
+        self._history: Dict[str, Deque[Tuple[int, Frame, Optional[str]]]] = {}  # topic -> (seq, frame, location)
+        self._evicted: Dict[str, int] = {}  # topic -> seq of the newest message pushed out of its buffer
+        self.resumed = 0
+        self.resyncs = 0
         self._heartbeat_task: asyncio.Task | None = None
+        self._metrics_task: asyncio.Task | None = None
+        self._transport = None
+        self.broadcast_latency_ms = ShardedHistogram()
+        self.slow_dropped = 0
+        self.slow_downgraded = 0
+        self.messages_skipped = 0
+        self._all_topics: Set[_Client] = set()            # clients without a topic filter
+        self._by_topic: Dict[str, Set[_Client]] = {}
 
     async def connect(self, websocket: WebSocket):
         """Accepts and stores a new WebSocket connection."""
-        await websocket.accept()
-        self.active[websocket] = time.time()
-        print(f"WebSocket {websocket.client} connected. Total clients: {len(self.active)}")
+        params = getattr(websocket, "query_params", None) or {}
+        offered = (getattr(websocket, "scope", None) or {}).get("subprotocols") or []
+        subprotocol = next((p for p in offered if p in ENCODINGS), None)
+        encoding = subprotocol or params.get("encoding") or "json"
+        if encoding == "msgpack":
+            try:
+                import msgpack  # noqa: F401
+            except ImportError:
+                logger.warning("msgpack is not installed; %s gets JSON frames", websocket.client)
+                encoding = "json"
+                if subprotocol:
+                    subprotocol = "json" if "json" in offered else None
+        if subprotocol:
+            await websocket.accept(subprotocol=subprotocol)
+        else:
+            await websocket.accept()
+        client = _Client(websocket, self.send_queue_size)
+        client.encoding = encoding if encoding in ENCODINGS else "json"
+        try:
+            client.coalesce_s = max(0.0, float(params.get("coalesce_ms", self.coalesce_ms))) / 1000.0
+        except ValueError:
+            client.coalesce_s = self.coalesce_ms / 1000.0
+        client.topics = _names(params.get("topics"))
+        client.locations = _names(params.get("locations"))
+        client.writer = asyncio.create_task(self._writer(client))
+        self.active[websocket] = client
+        # no await from here on: the replay is queued before the client can see live messages
+        self._handshake(client, params.get("epoch"), params.get("resume_from"))
+        self._index(client)
+        logger.info("WebSocket %s connected. Total clients: %d", websocket.client, len(self.active))
         if self._heartbeat_task is None:
             self._heartbeat_task = asyncio.create_task(self._heartbeat_loop())
-            print("Heartbeat loop started.")
+            logger.debug("Heartbeat loop started.")
 
-    def disconnect(self, websocket: WebSocket):
-        """Removes a WebSocket connection."""
-        if websocket in self.active:
-            del self.active[websocket]
-            print(f"WebSocket {websocket.client} disconnected. Total clients: {len(self.active)}")
+    def disconnect(self, websocket: WebSocket, close_code: int | None = None):
+        """Removes a WebSocket connection (and closes it when `close_code` is given)."""
+        client = self.active.pop(websocket, None)
+        if client is None:
+            return
+        self._unindex(client)
+        if client.writer is not None and client.writer is not asyncio.current_task():
+            client.writer.cancel()
+        if close_code is not None:
+            asyncio.ensure_future(self._close(websocket, close_code))
+        logger.info("WebSocket %s disconnected. Total clients: %d", websocket.client, len(self.active))
+
+    @staticmethod
+    async def _close(websocket: WebSocket, code: int):
+        try:
+            await websocket.close(code=code)
+        except Exception:
+            pass
 
     def update_last_pong(self, websocket: WebSocket):
-        if websocket in self.active:
-            self.active[websocket] = time.time()
-            print(f"Received pong from {websocket.client}")
+        client = self.active.get(websocket)
+        if client is not None:
+            client.last_pong = time.time()
+
+    # ---------- subscriptions ----------
+    def _index(self, client: _Client):
+        if client.topics is None:
+            self._all_topics.add(client)
+        else:
+            for t in client.topics:
+                self._by_topic.setdefault(t, set()).add(client)
+
+    def _unindex(self, client: _Client):
+        self._all_topics.discard(client)
+        for t in client.topics or ():
+            clients = self._by_topic.get(t)
+            if clients is not None:
+                clients.discard(client)
+                if not clients:
+                    del self._by_topic[t]
+
+    def subscribe(self, websocket: WebSocket, topics: Optional[Iterable[str]] = None,
+                  locations: Optional[Iterable[str]] = None) -> Optional[Dict[str, Any]]:
+        """
+        Add topics/locations to a client's filters (the first subscribe replaces the
+        default "everything"); "*" lifts that filter. Returns the resulting filters,
+        None for an unknown connection; ValueError on malformed lists.
+        """
+        client = self.active.get(websocket)
+        if client is None:
+            return None
+        new_topics, new_locations = _names(topics), _names(locations)  # validate before touching state
+        self._unindex(client)
+        if topics is not None:
+            client.topics = None if new_topics is None else (client.topics or set()) | new_topics
+        if locations is not None:
+            client.locations = None if new_locations is None else (client.locations or set()) | new_locations
+        self._index(client)
+        return self.filters(websocket)
+
+    def unsubscribe(self, websocket: WebSocket, topics: Optional[Iterable[str]] = None,
+                    locations: Optional[Iterable[str]] = None) -> Optional[Dict[str, Any]]:
+        """
+        Remove topics/locations from a client's filters; "*" removes them all. Filters
+        are allow-lists, so removing single names from an unfiltered ("*") key is
+        rejected with ValueError: subscribe to the wanted names instead.
+        """
+        client = self.active.get(websocket)
+        if client is None:
+            return None
+        drop_topics, drop_locations = _names(topics), _names(locations)
+        if drop_topics and client.topics is None:
+            raise ValueError('topics: not subscribed to specific topics ("*"); subscribe to the ones wanted instead')
+        if drop_locations and client.locations is None:
+            raise ValueError('locations: not subscribed to specific locations ("*"); subscribe to the ones wanted instead')
+        self._unindex(client)
+        if topics is not None:
+            client.topics = set() if drop_topics is None else (client.topics - drop_topics if client.topics is not None else None)
+        if locations is not None:
+            client.locations = set() if drop_locations is None else (client.locations - drop_locations if client.locations is not None else None)
+        self._index(client)
+        return self.filters(websocket)
+
+    def filters(self, websocket: WebSocket) -> Optional[Dict[str, Any]]:
+        client = self.active.get(websocket)
+        if client is None:
+            return None
+        return {
+            "topics": "*" if client.topics is None else sorted(client.topics),
+            "locations": "*" if client.locations is None else sorted(client.locations),
+        }
+
+    def send_to(self, websocket: WebSocket, message: dict) -> bool:
+        """Queue a message for one client (e.g. a protocol reply)."""
+        client = self.active.get(websocket)
+        return client is not None and self._offer(client, Frame(message))
+
+    def _targets(self, topic: Optional[str], location: Optional[str]) -> List[_Client]:
+        if topic is None:
+            candidates = list(self.active.values())
+        else:
+            by_topic = self._by_topic.get(topic)
+            candidates = list(self._all_topics) + list(by_topic) if by_topic else list(self._all_topics)
+        if location is None:
+            return candidates
+        return [c for c in candidates if c.locations is None or location in c.locations]
+
+    # ---------- sequencing / resume ----------
+    def _record(self, seq: int, frame: Frame, topic: Optional[str], location: Optional[str]):
+        if topic is None or topic in self.unbuffered_topics or self.replay_size <= 0:
+            return
+        hist = self._history.get(topic)
+        if hist is None:
+            hist = self._history[topic] = deque(maxlen=self.replay_size)
+        elif len(hist) == hist.maxlen:
+            self._evicted[topic] = hist[0][0]
+        hist.append((seq, frame, location))
+
+    def replay(self, client: _Client, after: int) -> Optional[List[Frame]]:
+        """Buffered messages after seq `after` that match the client's filters, oldest first; None on a gap."""
+        if after > self.seq:
+            return None
+        topics = self._history.keys() if client.topics is None else client.topics
+        missed: List[Tuple[int, Frame]] = []
+        for topic in topics:
+            if self._evicted.get(topic, -1) > after:
+                return None
+            for seq, frame, location in reversed(self._history.get(topic, ())):
+                if seq <= after:
+                    break
+                if location is None or client.locations is None or location in client.locations:
+                    missed.append((seq, frame))
+        missed.sort(key=lambda m: m[0])
+        return [frame for _, frame in missed]
+
+    def _handshake(self, client: _Client, epoch: Optional[str], resume_from: Optional[str]):
+        hello: Dict[str, Any] = {"epoch": self.epoch, "seq": self.seq}
+        missed: Optional[List[Frame]] = None
+        if resume_from is not None:
+            try:
+                after = int(resume_from)
+            except ValueError:
+                after = -1
+            if epoch == self.epoch and after >= 0:
+                missed = self.replay(client, after)
+            if missed is None:
+                hello["resync"] = True
+                self.resyncs += 1
+            else:
+                hello.update(resumed_from=after, replayed=len(missed))
+                self.resumed += 1
+        self._offer(client, Frame({"type": "hello", "payload": hello}))
+        if missed:
+            self._offer(client, missed[0] if len(missed) == 1 else Frame(text=batch_text(missed)))
+
+    async def _writer(self, client: _Client):
+        ws, q = client.ws, client.queue
+        try:
+            while True:
+                frames = [await q.get()]
+                if client.coalesce_s:
+                    await asyncio.sleep(client.coalesce_s)  # let the burst pile up
+                    while not q.empty():
+                        frames.append(q.get_nowait())
+                await self._send(client, frames)
+                if client.degraded and q.qsize() == 0:
+                    client.degraded = False
+                    if client.skipped:
+                        await self._send(client, [Frame({"type": "overflow", "payload": {"skipped": client.skipped}})])
+                        client.skipped = 0
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.info("Failed to send to %s: %s. Disconnecting.", ws.client, e)
+            self.disconnect(ws)
+
+    @staticmethod
+    async def _send(client: _Client, frames: List[Frame]):
+        """One wire frame in the client's encoding: the message itself, or a batch of several."""
+        if client.encoding == "msgpack":
+            await client.ws.send_bytes(frames[0].packed() if len(frames) == 1 else batch_packed(frames))
+        else:
+            await client.ws.send_text(frames[0].text if len(frames) == 1 else batch_text(frames))
+        client.sent += len(frames)
+        client.frames += 1
+
+    def _offer(self, client: _Client, frame: Frame) -> bool:
+        """Queue one frame for a client without waiting; applies the slow-client policy."""
+        q = client.queue
+        if client.degraded and q.qsize() >= q.maxsize // 2:
+            client.skipped += 1
+            self.messages_skipped += 1
+            return False
+        try:
+            q.put_nowait(frame)
+            return True
+        except asyncio.QueueFull:
+            pass
+        if self.slow_client_policy == "drop":
+            self.slow_dropped += 1
+            logger.warning("Client %s cannot keep up. Disconnecting.", client.ws.client)
+            self.disconnect(client.ws, close_code=1013)
+            return False
+        # downgrade: shed the backlog, keep the connection
+        skipped = q.qsize() + 1
+        while not q.empty():
+            q.get_nowait()
+        client.skipped += skipped
+        self.messages_skipped += skipped
+        if not client.degraded:
+            client.degraded = True
+            self.slow_downgraded += 1
+        return False
 
     async def _heartbeat_loop(self):
         while True:
             await asyncio.sleep(self.heartbeat_interval)
-            now = time.time()
-            print(f"Running heartbeat check. Active connections: {len(self.active)}")
-            dead: List[WebSocket] = []
-            for ws, last_pong in self.active.items():
-                if now - last_pong > self.timeout:
-                    print(f"Client {ws.client} timed out. Disconnecting.")
-                    dead.append(ws)
-                else:
-                    try:
-                        print(f"Sending ping to {ws.client}")
-                        await ws.send_json({"type": "ping"})
-                    except Exception as e:
-                        print(f"Failed to send ping to {ws.client}: {e}. Disconnecting.")
-                        dead.append(ws)
-            
-            for ws in dead:
-                self.disconnect(ws)
+            try:
+                self._heartbeat()
+            except Exception:
+                logger.exception("Heartbeat round failed")
 
-    async def broadcast(self, message: dict):
-        """Sends a JSON message to all active connections."""
-        print(f"Broadcasting message to {len(self.active)} clients: {message}")
+    def _heartbeat(self):
+        now = time.time()
         dead: List[WebSocket] = []
-        for ws in self.active:
-            try:
-                await ws.send_json(message)
-            except Exception as e:
-                print(f"Failed to broadcast to {ws.client}: {e}. Disconnecting.")
+        # snapshot: _offer may disconnect a client (slow_client_policy="drop") mid-round
+        for ws, client in list(self.active.items()):
+            if ws not in self.active:
+                continue
+            if now - client.last_pong > self.timeout:
+                logger.info("Client %s timed out. Disconnecting.", ws.client)
                 dead.append(ws)
-        
+            else:
+                self._offer(client, PING_FRAME)
+
         for ws in dead:
-            self.disconnect(ws)
+            self.disconnect(ws, close_code=1001)
+
+    def start_metrics_push(self, source: Callable[[], Dict[str, Any]], interval: float = 1.0):
+        """Broadcast {"type": "metrics", "payload": source()} every `interval` seconds while clients are connected."""
+        if self._metrics_task is None:
+            self._metrics_task = asyncio.create_task(self._metrics_loop(source, interval))
+
+    async def stop_metrics_push(self):
+        if self._metrics_task is not None:
+            self._metrics_task.cancel()
+            try:
+                await self._metrics_task
+            except asyncio.CancelledError:
+                pass
+            self._metrics_task = None
+
+    async def _metrics_loop(self, source: Callable[[], Dict[str, Any]], interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            if not self.active:
+                continue
+            try:
+                payload = source()
+            except Exception as e:
+                logger.warning("Metrics source failed: %s", e)
+                continue
+            await self.broadcast({"type": "metrics", "payload": payload, "title": "Runtime Metrics"})
+
+    def attach_transport(self, transport, loop: asyncio.AbstractEventLoop):
+        """
+        Mirror broadcasts to the other backend processes on the same event broker
+        (runtime.transport), and relay theirs to this process's clients on `loop`.
+        """
+        self._transport = transport
+        # peers forward the already-encoded frame (with its routing keys), so it is serialized once cluster-wide
+        transport.handle(WS_BROADCAST_TOPIC, lambda item: loop.call_soon_threadsafe(self.broadcast_frame, *item))
+
+    async def broadcast(self, message: dict):
+        """Sends a JSON message to every interested connection, in every attached process."""
+        frame = Frame(message)
+        topic, location = message.get("type"), message_location(message)
+        logger.debug("Broadcasting %s message", topic)
+        if self._transport is not None:
+            self._transport.send(WS_BROADCAST_TOPIC, [frame.text, topic, location])
+        self.broadcast_frame(frame, topic, location)
+
+    def broadcast_frame(self, frame: Frame | str, topic: Optional[str] = None, location: Optional[str] = None):
+        """
+        Numbers one pre-encoded frame (or JSON text) in this process's stream, buffers it for
+        resuming clients and queues it for the connections subscribed to `topic` / `location`
+        (None: no filtering on that key); never waits on a socket.
+        """
+        if isinstance(frame, str):
+            frame = Frame(text=frame)
+        t0 = time.perf_counter()
+        self.seq += 1
+        message = frame.message
+        frame = Frame(None if message is None else {"seq": self.seq, **message}, text=with_seq(frame.text, self.seq))
+        self._record(self.seq, frame, topic, location)
+        for client in self._targets(topic, location):
+            self._offer(client, frame)
+        self.broadcast_latency_ms.observe((time.perf_counter() - t0) * 1000.0)
 
+    def stats(self) -> Dict[str, Any]:
+        clients = list(self.active.values())
+        queued = [c.queue.qsize() for c in clients]
+        return {
+            "clients": len(clients),
+            "msgpack_clients": sum(1 for c in clients if c.encoding == "msgpack"),
+            "coalescing_clients": sum(1 for c in clients if c.coalesce_s),
+            "degraded": sum(1 for c in clients if c.degraded),
+            "queued_max": max(queued, default=0),
+            "queued_total": sum(queued),
+            "slow_dropped": self.slow_dropped,
+            "slow_downgraded": self.slow_downgraded,
+            "messages_skipped": self.messages_skipped,
+            "seq": self.seq,
+            "replay_buffered": sum(len(h) for h in list(self._history.values())),
+            "resumed": self.resumed,
+            "resyncs": self.resyncs,
+        }
 
 # Singleton instance for the connection manager
-manager = ConnectionManager(heartbeat_interval=5, timeout=10)
\ No newline at end of file
+manager = ConnectionManager(heartbeat_interval=5, timeout=10, coalesce_ms=float(os.getenv("WS_COALESCE_MS", "0")))
\ No newline at end of file
@@ -5,12 +5,31 @@ from experiments.autonomous_driving import main as ad_main
 from experiments.city_realtime import main as city_rt_main
 from experiments.ad_realtime import main as ad_rt_main
 
+def _build_llm(args):
+    """Optional mock LLM, then --record/--replay cassette wrapping; None keeps the experiment default."""
+    llm = None
+    if getattr(args, "mock_latency", None):
+        from integrations.mock_llm import MockLLM
+        llm = MockLLM.from_spec(args.mock_latency, seed=args.seed)
+    if args.record or args.replay:
+        from integrations.cassette import wrap_llm
+        if llm is None and args.record:
+            from integrations.spark_x1 import get_llm_with_fallback
+            llm = get_llm_with_fallback()
+        llm = wrap_llm(llm, record=args.record, replay=args.replay, realtime=args.replay_realtime)
+    return llm
+
+def _add_cassette_args(p):
+    p.add_argument("--record", type=str, default=None, help="append LLM calls to this cassette file")
+    p.add_argument("--replay", type=str, default=None, help="serve LLM calls from this cassette file")
+    p.add_argument("--replay-realtime", action="store_true", help="sleep for the recorded latency on replay")
+
 def run_city(args):
-    res = city_main(ticks=args.ticks, p_fall=args.p_fall, p_low_moisture=args.p_moisture, seed=args.seed, outdir=args.outdir, with_cache=args.with_cache, llm_delay_ms=args.llm_delay_ms)
+    res = city_main(ticks=args.ticks, p_fall=args.p_fall, p_low_moisture=args.p_moisture, seed=args.seed, outdir=args.outdir, with_cache=args.with_cache, llm_delay_ms=args.llm_delay_ms, llm=_build_llm(args))
     print("[CITY] done:", res, "metrics->", os.path.abspath(args.outdir))
 
 def run_ad(args):
-    res = ad_main(ticks=args.ticks, p_collision=args.p_collision, seed=args.seed, outdir=args.outdir, with_cache=args.with_cache, llm_delay_ms=args.llm_delay_ms)
+    res = ad_main(ticks=args.ticks, p_collision=args.p_collision, seed=args.seed, outdir=args.outdir, with_cache=args.with_cache, llm_delay_ms=args.llm_delay_ms, llm=_build_llm(args))
     print("[AD] done:", res, "metrics->", os.path.abspath(args.outdir))
 
 def run_city_rt(args):
@@ -33,6 +52,8 @@ def main():
     p_city.add_argument("--outdir", type=str, default="results/city")
     p_city.add_argument("--with-cache", type=lambda x: x.lower()=="true", default=True)
     p_city.add_argument("--llm-delay-ms", type=int, default=0)
+    p_city.add_argument("--mock-latency", type=str, default=None, help="seeded mock LLM latency, e.g. lognormal:40,0.5 or bimodal:0.1,30,400")
+    _add_cassette_args(p_city)
     p_city.set_defaults(func=run_city)
 
     p_ad = sub.add_parser("ad")
@@ -42,6 +63,7 @@ def main():
     p_ad.add_argument("--outdir", type=str, default="results/ad")
     p_ad.add_argument("--with-cache", type=lambda x: x.lower()=="true", default=True)
     p_ad.add_argument("--llm-delay-ms", type=int, default=0)
+    _add_cassette_args(p_ad)
     p_ad.set_defaults(func=run_ad)
     
     # Real-time data demo
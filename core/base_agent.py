@@ -24,9 +24,9 @@ class BaseAgent:
         """A convenience method to generate a task for this agent."""
         return self._dsl.gen(name, prompt=prompt, agent=self.role, **kwargs)
 
-    def on(self, topic: str, fn: Callable[[Any], None]):
-        """Subscribes to a topic on the event bus."""
-        self._dsl.on(topic, fn)
+    def on(self, topic: str, fn: Callable[[Any], Any], loop: Optional[Any] = None, where: Optional[dict] = None):
+        """Subscribes to a topic on the event bus, optionally filtered on payload fields (see DSL.on)."""
+        self._dsl.on(topic, fn, loop=loop, where=where)
 
     def emit(self, topic: str, payload: Any):
         """Emits an event to the event bus."""
@@ -1,27 +1,260 @@
 
 from __future__ import annotations
-from typing import Any, Dict, Optional, List
-import json, re
+from typing import Any, Callable, Dict, Optional, List, Tuple
+from collections import OrderedDict
+import hashlib, json, re, threading
+
+from core.repair import iter_json_candidates
+
+Validator = Callable[[Any], bool]
+
+def _always_true(_v: Any) -> bool:
+    return True
+
+_TYPE_CHECKS: Dict[str, Validator] = {
+    "string": lambda v: isinstance(v, str),
+    # JSON has one number type, so 1.0 is an integer (JSON Schema draft 6+)
+    "integer": lambda v: (isinstance(v, int) and not isinstance(v, bool)) or (isinstance(v, float) and v.is_integer()),
+    "number": lambda v: isinstance(v, (int, float)) and not isinstance(v, bool),
+    "boolean": lambda v: isinstance(v, bool),
+    "object": lambda v: isinstance(v, dict),
+    "array": lambda v: isinstance(v, list),
+    "null": lambda v: v is None,
+}
+
+# schema hash -> compiled validator; shared by every Contract using the same schema
+_COMPILED: Dict[str, Validator] = {}
+_COMPILED_LOCK = threading.Lock()
+
+def schema_hash(schema: Dict) -> str:
+    """Stable hash of a schema (key order does not matter)."""
+    blob = json.dumps(schema, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha1(blob.encode("utf-8")).hexdigest()
+
+def _json_equal(a: Any, b: Any) -> bool:
+    """JSON equality: like ==, except booleans never equal numbers (True == 1 in Python)."""
+    if isinstance(a, bool) or isinstance(b, bool):
+        return type(a) is type(b) and a == b
+    if isinstance(a, dict):
+        return isinstance(b, dict) and a.keys() == b.keys() and all(_json_equal(a[k], b[k]) for k in a)
+    if isinstance(a, list):
+        return isinstance(b, list) and len(a) == len(b) and all(map(_json_equal, a, b))
+    return a == b
+
+def _all_of(checks: List[Validator]) -> Validator:
+    if not checks:
+        return _always_true
+    if len(checks) == 1:
+        return checks[0]
+    checks = tuple(checks)
+    def _check(v: Any) -> bool:
+        for c in checks:
+            if not c(v):
+                return False
+        return True
+    return _check
+
+def _compile(schema: Dict) -> Validator:
+    """
+    Compile a JSON-schema subset into a closure tree:
+    type (single or list), enum, pattern, properties (nested), required, items.
+    Each node of the parsed object is visited once.
+    """
+    checks: List[Validator] = []
+
+    t = schema.get("type")
+    if t:
+        names = [t] if isinstance(t, str) else list(t)
+        unknown = [n for n in names if n not in _TYPE_CHECKS]
+        if unknown:
+            raise ValueError(f"unsupported schema type(s): {unknown}")
+        fns = tuple(_TYPE_CHECKS[n] for n in names)
+        checks.append(fns[0] if len(fns) == 1 else (lambda v: any(f(v) for f in fns)))
+
+    if "enum" in schema:
+        allowed = list(schema["enum"])
+        try:
+            # (is bool, value) keys: True and 1 hash alike but are different JSON values
+            allowed_set = frozenset((a.__class__ is bool, a) for a in allowed)
+            checks.append(lambda v: ((v.__class__ is bool, v) in allowed_set) if v.__hash__
+                          else any(_json_equal(v, a) for a in allowed))
+        except TypeError:  # unhashable members (objects/arrays) fall back to a list scan
+            checks.append(lambda v: any(_json_equal(v, a) for a in allowed))
+
+    if "pattern" in schema:
+        pat = re.compile(schema["pattern"])
+        checks.append(lambda v: (not isinstance(v, str)) or (pat.search(v) is not None))
+
+    required = tuple(schema.get("required", ()))
+    props = tuple((k, _compile(sub)) for k, sub in (schema.get("properties") or {}).items())
+    props = tuple((k, fn) for k, fn in props if fn is not _always_true)
+    if required or props:
+        def _check_obj(v: Any) -> bool:
+            if not isinstance(v, dict):
+                return True  # non-objects are the 'type' keyword's concern
+            for k in required:
+                if k not in v:
+                    return False
+            for k, fn in props:
+                if k in v and not fn(v[k]):
+                    return False
+            return True
+        checks.append(_check_obj)
+
+    if "items" in schema:
+        item_fn = _compile(schema["items"])
+        if item_fn is not _always_true:
+            checks.append(lambda v: (not isinstance(v, list)) or all(item_fn(x) for x in v))
+
+    return _all_of(checks)
+
+def compile_schema(schema: Optional[Dict], key: Optional[str] = None) -> Validator:
+    """
+    Return the compiled validator for `schema`, compiling at most once per distinct schema.
+    `key` is schema_hash(schema) when the caller already has it.
+    """
+    if not schema:
+        return _always_true
+    if key is None:
+        key = schema_hash(schema)
+    fn = _COMPILED.get(key)
+    if fn is None:
+        with _COMPILED_LOCK:
+            fn = _COMPILED.get(key)
+            if fn is None:
+                fn = _compile(schema)
+                _COMPILED[key] = fn
+    return fn
+
+# id(schema) -> (schema, hash, validator). Contracts built per task reuse the agent's schema
+# dict, so hashing it once per object is enough; schemas must not be mutated once in use.
+_BY_ID: Dict[int, Tuple[Dict, Optional[str], Validator]] = {}
+_BY_ID_MAX = 1024
+
+def _contract_schema(schema: Dict) -> Tuple[Optional[str], Validator]:
+    """(schema hash, validator) for a Contract's top-level schema."""
+    if not schema:
+        return None, _always_true
+    entry = _BY_ID.get(id(schema))
+    if entry is not None and entry[0] is schema:
+        return entry[1], entry[2]
+    top = schema
+    if "type" not in top and ("required" in top or "properties" in top):
+        top = {**top, "type": "object"}  # a bare 'required' list has always implied a JSON object
+    key = schema_hash(top)
+    fn = compile_schema(top, key)
+    with _COMPILED_LOCK:
+        if len(_BY_ID) >= _BY_ID_MAX:
+            _BY_ID.clear()
+        _BY_ID[id(schema)] = (schema, key, fn)  # holding `schema` keeps its id from being reused
+    return key, fn
+
+# Regex sources that fullmatch every string (with DOTALL) or every line-free string (without).
+_ANY_TEXT = {".*", ".*?", "(.*)", "(?:.*)", "^.*$", "(?s).*", "(?s:.*)"}
+_ANY_TEXT_CLASSES = {"[\\s\\S]*", "[\\w\\W]*", "[\\d\\D]*", "[^\\n]*"}
+
+def analyze_regex(rx: Optional["re.Pattern[str]"]) -> Optional[Callable[[str], bool]]:
+    """
+    Return an equivalent cheap check for common catch-all patterns, or None if the
+    regex has to run. `_always_true` means the pattern accepts every output.
+    """
+    if rx is None:
+        return _always_true
+    src = rx.pattern
+    if src in _ANY_TEXT_CLASSES:
+        return _always_true if src != "[^\\n]*" else (lambda s: "\n" not in s)
+    if src in _ANY_TEXT:
+        if src.startswith("(?s") or (rx.flags & re.DOTALL):
+            return _always_true
+        # '.' stops at newline only, so fullmatch('.*') is exactly "no newline"
+        return lambda s: "\n" not in s
+    return None
+
+class _ValidationMemo:
+    """Bounded LRU of output digest -> validation result, shared by equivalent contracts."""
+    def __init__(self, capacity: int = 4096):
+        self.capacity = capacity
+        self._d: "OrderedDict[bytes, bool]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: bytes) -> Optional[bool]:
+        with self._lock:
+            ok = self._d.get(key)
+            if ok is None:
+                self.misses += 1
+                return None
+            self._d.move_to_end(key)
+            self.hits += 1
+            return ok
+
+    def put(self, key: bytes, ok: bool):
+        with self._lock:
+            self._d[key] = ok
+            self._d.move_to_end(key)
+            if len(self._d) > self.capacity:
+                self._d.popitem(last=False)
+
+# contract signature (regex, flags, schema hash) -> memo
+_MEMOS: Dict[tuple, _ValidationMemo] = {}
+_MEMOS_LOCK = threading.Lock()
+
+def _memo_for(signature: tuple) -> _ValidationMemo:
+    memo = _MEMOS.get(signature)
+    if memo is None:
+        with _MEMOS_LOCK:
+            memo = _MEMOS.setdefault(signature, _ValidationMemo())
+    return memo
 
 class Contract:
-    """Lightweight output contract: regex + minimal JSON 'required' validation."""
+    """Lightweight output contract: regex + compiled JSON-schema validation."""
     def __init__(self, name: str, schema: Optional[Dict]=None, regex: Optional[str]=None):
         self.name = name
         self.schema = schema or {}
         self.regex = re.compile(regex) if regex else None
+        key, self._validator = _contract_schema(self.schema)
+        self._regex_check = analyze_regex(self.regex)
+        self.is_trivial = (self._regex_check is _always_true) and (self._validator is _always_true)
+        self.repairable = self._validator is not _always_true
+        # Only memoize when validation costs more than hashing the output.
+        self._memo: Optional[_ValidationMemo] = None
+        if self._validator is not _always_true or self._regex_check is None:
+            rx = (self.regex.pattern, self.regex.flags) if self.regex else None
+            self._memo = _memo_for((rx, key))
 
     def validate(self, text: str) -> bool:
-        if self.regex and not self.regex.fullmatch(text or ''):
-            return False
-        req: List[str] = list(self.schema.get('required', []))
-        if req:
-            try:
-                obj = json.loads(text)
-                if not isinstance(obj, dict):
-                    return False
-                for k in req:
-                    if k not in obj:
-                        return False
-            except Exception:
+        if self.is_trivial:
+            return True
+        text = text or ''
+        if self._memo is None:
+            return self._regex_check(text)
+        key = hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+        ok = self._memo.get(key)
+        if ok is None:
+            ok = self._validate(text)
+            self._memo.put(key, ok)
+        return ok
+
+    def _validate(self, text: str) -> bool:
+        if self._regex_check is None:
+            if not self.regex.fullmatch(text):
                 return False
-        return True
+        elif not self._regex_check(text):
+            return False
+        if self._validator is _always_true:
+            return True
+        try:
+            obj = json.loads(text)
+        except Exception:
+            return False
+        return self._validator(obj)
+
+    def repair(self, text: str) -> Optional[str]:
+        """Locally fix near-miss JSON output; returns the repaired text only if it validates."""
+        if not self.repairable:
+            return None
+        for fixed in iter_json_candidates(text or ''):
+            if fixed != text and self.validate(fixed):
+                return fixed
+        return None
@@ -1,8 +1,11 @@
 # core/llm.py
 import os
 import json
+import time
+import asyncio
 import logging
-from functools import lru_cache
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, Union
 
 import httpx
 
@@ -11,8 +14,11 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 DEEPSEEK_API_KEY = os.getenv("DEEPSEEK_API_KEY", "").strip()
-DEEPSEEK_BASE = "https://api.deepseek.com/v1/chat/completions"
+DEEPSEEK_BASE = os.getenv("DEEPSEEK_BASE_URL", "https://api.deepseek.com/v1/chat/completions")
 DEEPSEEK_MODEL = "deepseek-chat"
+REPORT_CACHE_TTL_S = float(os.getenv("REPORT_CACHE_TTL_S", "300"))
+
+_http_client: Optional[httpx.AsyncClient] = None
 
 
 def get_llm():
@@ -22,11 +28,97 @@ def get_llm():
     return None
 
 
-@lru_cache(maxsize=128)
-async def generate_report_with_deepseek(report_data: str, language: str = "en") -> str:
+class AsyncTTLCache:
+    """
+    TTL + LRU cache for async producers with single-flight: concurrent callers for
+    the same key share one in-flight computation instead of each hitting the API.
+    Must be used from a single event loop.
+    """
+
+    def __init__(self, ttl_s: float = 300.0, maxsize: int = 128):
+        self.ttl_s = ttl_s
+        self.maxsize = maxsize
+        self._data: "OrderedDict[Any, Tuple[float, Any]]" = OrderedDict()
+        self._inflight: Dict[Any, "asyncio.Future[Any]"] = {}
+
+    async def get_or_compute(self, key: Any, factory: Callable[[], Awaitable[Any]],
+                             cache_if: Callable[[Any], bool] = lambda v: True) -> Any:
+        hit = self._data.get(key)
+        if hit is not None:
+            if hit[0] > time.monotonic():
+                self._data.move_to_end(key)
+                return hit[1]
+            del self._data[key]
+        fut = self._inflight.get(key)
+        if fut is None:
+            fut = asyncio.ensure_future(factory())
+            self._inflight[key] = fut
+            fut.add_done_callback(lambda f: self._settle(key, f, cache_if))
+        # shield: a cancelled waiter must not cancel the shared request
+        return await asyncio.shield(fut)
+
+    def _settle(self, key: Any, fut: "asyncio.Future[Any]", cache_if: Callable[[Any], bool]):
+        self._inflight.pop(key, None)
+        if fut.cancelled() or fut.exception() is not None:
+            return
+        value = fut.result()
+        if cache_if(value):
+            self._data[key] = (time.monotonic() + self.ttl_s, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        self._data.clear()
+
+
+_report_cache = AsyncTTLCache(ttl_s=REPORT_CACHE_TTL_S, maxsize=128)
+
+
+def _canonical_report_data(report_data: Union[str, Dict[str, Any]]) -> str:
+    """Order-insensitive text form of the report data, used for the prompt and the cache key."""
+    if isinstance(report_data, str):
+        return report_data
+    return json.dumps(report_data, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+async def startup_llm_client() -> httpx.AsyncClient:
+    """Create the shared pooled HTTP client (call from app startup)."""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            timeout=30,
+            limits=httpx.Limits(max_connections=20, max_keepalive_connections=10, keepalive_expiry=60),
+        )
+    return _http_client
+
+
+async def shutdown_llm_client():
+    """Close the shared HTTP client and drop cached reports (call from app shutdown)."""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+    _report_cache.clear()
+
+
+async def generate_report_with_deepseek(report_data: Union[str, Dict[str, Any]], language: str = "en") -> str:
     """
     Generates a report using the DeepSeek API with caching.
-    The report_data is a JSON string to be cacheable.
+    report_data may be a dict or a JSON string; dicts are canonicalized so equal data
+    shares a cache entry. Concurrent identical requests share one API call.
+    """
+    data_text = _canonical_report_data(report_data)
+    return await _report_cache.get_or_compute(
+        (data_text, language),
+        lambda: _request_report(data_text, language),
+        cache_if=lambda report: not report.startswith(("[API ERROR]", "[UNEXPECTED ERROR]")),
+    )
+
+
+async def _request_report(report_data: str, language: str) -> str:
+    """
+    Calls the DeepSeek chat API over the shared client.
     Returns a local placeholder if the API key is not set.
     """
     if not DEEPSEEK_API_KEY:
@@ -59,20 +151,20 @@ async def generate_report_with_deepseek(report_data: str, language: str = "en")
         "temperature": 0.3,
     }
 
-    async with httpx.AsyncClient(timeout=30) as client:
-        try:
-            logger.info(f"Generating report for: {report_data}")
-            r = await client.post(DEEPSEEK_BASE, json=payload, headers=headers)
-            r.raise_for_status()
-            data = r.json()
-            report = data.get("choices", [{}])[0].get("message", {}).get("content", "")
-            if not report:
-                logger.error(f"Malformed API response: {data}")
-                return "[API ERROR] Malformed API response"
-            return report
-        except httpx.HTTPStatusError as e:
-            logger.error(f"API request failed with status {e.response.status_code}: {e.response.text}")
-            return f"[API ERROR] Failed to generate report: {e.response.status_code}"
-        except Exception as e:
-            logger.exception("An unexpected error occurred during report generation.")
-            return f"[UNEXPECTED ERROR] An unexpected error occurred: {e}"
\ No newline at end of file
+    client = await startup_llm_client()
+    try:
+        logger.info(f"Generating report for: {report_data}")
+        r = await client.post(DEEPSEEK_BASE, json=payload, headers=headers)
+        r.raise_for_status()
+        data = r.json()
+        report = data.get("choices", [{}])[0].get("message", {}).get("content", "")
+        if not report:
+            logger.error(f"Malformed API response: {data}")
+            return "[API ERROR] Malformed API response"
+        return report
+    except httpx.HTTPStatusError as e:
+        logger.error(f"API request failed with status {e.response.status_code}: {e.response.text}")
+        return f"[API ERROR] Failed to generate report: {e.response.status_code}"
+    except Exception as e:
+        logger.exception("An unexpected error occurred during report generation.")
+        return f"[UNEXPECTED ERROR] An unexpected error occurred: {e}"
\ No newline at end of file
@@ -0,0 +1,81 @@
+
+from __future__ import annotations
+from typing import Iterator, List, Optional, Tuple
+import json, re
+
+_FENCE = re.compile(r"```(?:json|JSON)?[ \t]*\n?(.*?)(?:```|$)", re.S)
+_CLOSER = {"{": "}", "[": "]"}
+
+def _balance(src: str, start: int) -> Tuple[Optional[str], int]:
+    """
+    Copy one JSON value starting at src[start] ('{' or '['), dropping trailing commas
+    before closers and closing whatever is still open when the text runs out.
+    Returns (candidate, index just past the consumed source).
+    """
+    out: List[str] = []
+    stack: List[str] = []
+    in_str = esc = False
+    for i in range(start, len(src)):
+        ch = src[i]
+        if in_str:
+            out.append(ch)
+            if esc:
+                esc = False
+            elif ch == "\\":
+                esc = True
+            elif ch == '"':
+                in_str = False
+            continue
+        if ch == '"':
+            in_str = True
+        elif ch in _CLOSER:
+            stack.append(_CLOSER[ch])
+        elif ch in "}]":
+            if not stack or stack[-1] != ch:
+                return None, i + 1
+            while out and out[-1] in " \t\r\n,":
+                out.pop()
+            stack.pop()
+            out.append(ch)
+            if not stack:
+                return "".join(out), i + 1
+            continue
+        out.append(ch)
+    # ran out of text: close the open string and containers (truncated output)
+    if esc:
+        out.pop()
+    if in_str:
+        out.append('"')
+    while out and out[-1] in " \t\r\n,:":
+        out.pop()
+    out.extend(reversed(stack))
+    return "".join(out), len(src)
+
+def iter_json_candidates(text: str, max_tries: int = 8) -> Iterator[str]:
+    """
+    Yield compact JSON objects recovered from near-miss LLM output: code fences,
+    leading/trailing prose, trailing commas, missing closing braces.
+    """
+    if not text:
+        return
+    m = _FENCE.search(text)
+    body = m.group(1) if m else text
+    start = body.find("{")
+    tries = 0
+    while start != -1 and tries < max_tries:
+        tries += 1
+        cand, end = _balance(body, start)
+        if cand is not None:
+            try:
+                obj = json.loads(cand)
+            except ValueError:
+                obj = None
+            if isinstance(obj, dict):
+                yield json.dumps(obj, ensure_ascii=False)
+                start = body.find("{", end)
+                continue
+        start = body.find("{", start + 1)
+
+def repair_json_text(text: str) -> Optional[str]:
+    """First recoverable JSON object in `text`, or None."""
+    return next(iter_json_candidates(text), None)
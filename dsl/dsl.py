@@ -1,10 +1,10 @@
 
 from __future__ import annotations
 from typing import Any, Dict, Callable, List, Optional
-import time
+import time, asyncio
 
 from runtime.radix_cache import RadixTrieCache
-from runtime.scheduler import CacheAwareScheduler, Task
+from runtime.scheduler import CacheAwareScheduler, SchedulerObserver, Task
 from runtime.eventbus import EventBus
 from core.contracts import Contract
 from utils.metrics import Metrics
@@ -66,19 +66,39 @@ class TaskBuilder:
         return task
 
 class DSL:
-    """The main entrypoint for the DSL, providing methods to define and coordinate agentic tasks."""
-    def __init__(self, seed: int = 7, workers:int=8):
+    """
+    The main entrypoint for the DSL, providing methods to define and coordinate agentic tasks.
+    keep_events=False stops recording per-task events (only needed for events.csv exports),
+    so long-running services keep constant-size metrics.
+    """
+    def __init__(self, seed: int = 7, workers:int=8, bus_partitions:int=1, bus_overflow:str="drop_newest",
+                 keep_events: bool = True, **bus_kwargs):
         self.cache = RadixTrieCache()
         self.scheduler = CacheAwareScheduler(workers=workers)
-        self.bus = EventBus()
+        self.bus = EventBus(partitions=bus_partitions, overflow=bus_overflow, **bus_kwargs)
         self._llm: Optional[Callable[[str, Optional[str]], str]] = None
-        self.metrics = Metrics()
-
-    def use_llm(self, llm_callable: Callable[[str, Optional[str]], str], *, use_cache: bool = True):
-        """Configure the LLM callable for the DSL and scheduler."""
+        self._llm_pinned = False
+        self.metrics = Metrics(keep_events=keep_events)
+
+    def use_llm(self, llm_callable: Callable[[str, Optional[str]], str], *, use_cache: bool = True, pin: bool = False):
+        """
+        Configure the LLM callable for the DSL and scheduler.
+        With pin=True, later use_llm calls (e.g. from agent programs) are ignored,
+        which lets harnesses fix the LLM and cache setting for a whole run.
+        """
+        if self._llm_pinned and not pin:
+            return
         self._llm = llm_callable
+        self._llm_pinned = pin
         self.scheduler.configure(llm=llm_callable, cache=self.cache, metrics=self.metrics, use_cache=use_cache)
 
+    def add_observer(self, observer: SchedulerObserver):
+        """Attach scheduler instrumentation hooks (see runtime.scheduler.SchedulerObserver)."""
+        self.scheduler.add_observer(observer)
+
+    def remove_observer(self, observer: SchedulerObserver):
+        self.scheduler.remove_observer(observer)
+
     def gen(self, name: str, *, prompt: str, agent: str) -> TaskBuilder:
         """Generate a new task with a given name, prompt, and agent."""
         return TaskBuilder(self, name, prompt, agent)
@@ -107,9 +127,19 @@ class DSL:
         else:
             raise ValueError(f"Unsupported join mode: {mode}")
 
-    def on(self, topic: str, fn: Callable[[Any], None]):
-        """Subscribe a function to a specific event topic."""
-        self.bus.subscribe(topic, fn)
+    def on(self, topic: str, fn: Callable[[Any], Any], loop: Optional[asyncio.AbstractEventLoop] = None,
+           where: Optional[Dict[str, Any]] = None):
+        """
+        Subscribe a function to an event topic; `*` matches one dot-separated segment, `#` any number.
+        Coroutine functions are run on `loop` (default: the running loop). `where` filters on
+        payload fields: a value (equality), a set (membership) or runtime.predicates.Range.
+        """
+        self.bus.subscribe(topic, fn, loop=loop, where=where)
+
+    def on_batch(self, topic: str, fn: Callable[[List[Any]], Any], *, max_batch: int = 100,
+                 max_latency_ms: float = 50.0, key: Any = None, loop: Optional[asyncio.AbstractEventLoop] = None):
+        """Subscribe `fn` to lists of payloads, optionally coalesced per `key` (see EventBus.subscribe_batch)."""
+        self.bus.subscribe_batch(topic, fn, max_batch=max_batch, max_latency_ms=max_latency_ms, key=key, loop=loop)
 
     def emit(self, topic: str, payload: Any):
         """Publish an event to a specific topic."""
@@ -17,6 +17,8 @@ const eventReducer = (state, action) => {
       return { ...state, events: [action.payload, ...state.events] };
     case 'CLEAR_EVENTS':
       return { ...state, events: [] };
+    case 'RESET':
+      return initialState;
     case 'SET_TRAFFIC':
       return { ...state, traffic: action.payload };
     case 'SET_WEATHER':
@@ -50,7 +52,12 @@ export const EventProvider = ({ children }) => {
     dispatch({ type: 'CLEAR_EVENTS' });
   }, [dispatch]);
 
-  const { sendMessage, readyState } = useWebSocket(wsUrl, onMessage);
+  // the server could not replay what was missed while disconnected: drop the stale state
+  const onResync = useCallback(() => {
+    dispatch({ type: 'RESET' });
+  }, [dispatch]);
+
+  const { sendMessage, readyState } = useWebSocket(wsUrl, onMessage, onResync);
 
   return (
     <EventContext.Provider value={{ state, dispatch, sendMessage, readyState, clearEvents }}>
@@ -1,51 +1,109 @@
 import { useEffect, useRef, useState } from 'react';
 
-const useWebSocket = (url, onMessage) => {
+const MIN_BACKOFF_MS = 500;
+const MAX_BACKOFF_MS = 10000;
+
+// reconnects carry the last stream position, so the server replays what was missed
+const resumeUrl = (url, stream) => {
+  if (!stream.epoch) {
+    return url;
+  }
+  const sep = url.includes('?') ? '&' : '?';
+  return `${url}${sep}epoch=${encodeURIComponent(stream.epoch)}&resume_from=${stream.seq}`;
+};
+
+const useWebSocket = (url, onMessage, onResync) => {
   const socket = useRef(null);
+  const stream = useRef({ epoch: null, seq: 0 });
   const [readyState, setReadyState] = useState(WebSocket.CONNECTING);
 
   useEffect(() => {
-    if (!socket.current) {
-      socket.current = new WebSocket(url);
+    let stopped = false;
+    let retry = null;
+    let backoff = MIN_BACKOFF_MS;
+
+    const handle = (message) => {
+      if (message.type === 'batch') {
+        // coalesced frame (?coalesce_ms=N) or replay after a resume: several messages at once;
+        // one failing message must not drop the rest of the batch
+        message.payload.forEach((item) => {
+          try {
+            handle(item);
+          } catch (error) {
+            console.error('Error handling WebSocket message:', error);
+          }
+        });
+      } else if (message.type === 'hello') {
+        if (message.payload.resync && onResync) {
+          // missed messages are gone (server restarted or buffer overrun): start from scratch
+          onResync();
+        }
+        stream.current = { epoch: message.payload.epoch, seq: message.payload.seq };
+      } else if (message.type === 'ping') {
+        if (socket.current && socket.current.readyState === WebSocket.OPEN) {
+          socket.current.send(JSON.stringify({ type: 'pong' }));
+        }
+      } else {
+        onMessage(message);
+        // advance only after the handler succeeds
+        if (message.seq) {
+          stream.current.seq = message.seq;
+        }
+      }
+    };
+
+    const connect = () => {
+      const ws = new WebSocket(resumeUrl(url, stream.current));
+      socket.current = ws;
       setReadyState(WebSocket.CONNECTING);
 
-      socket.current.onopen = () => {
+      ws.onopen = () => {
+        backoff = MIN_BACKOFF_MS;
         setReadyState(WebSocket.OPEN);
       };
 
-      socket.current.onmessage = (event) => {
+      ws.onmessage = (event) => {
+        let message;
         try {
-          const message = JSON.parse(event.data);
-          if (message.type === 'ping') {
-            if (socket.current && socket.current.readyState === WebSocket.OPEN) {
-              socket.current.send(JSON.stringify({ type: 'pong' }));
-            }
-          } else {
-            onMessage(message);
-          }
+          message = JSON.parse(event.data);
         } catch (error) {
           console.error('Error parsing WebSocket message:', error);
+          return;
+        }
+        try {
+          handle(message);
+        } catch (error) {
+          console.error('Error handling WebSocket message:', error);
         }
       };
 
-      socket.current.onclose = (event) => {
-        console.log('WebSocket disconnected:', event);
+      ws.onclose = (event) => {
         setReadyState(WebSocket.CLOSED);
+        if (stopped) {
+          return;
+        }
+        console.log(`WebSocket disconnected, reconnecting in ${backoff} ms:`, event);
+        retry = setTimeout(connect, backoff);
+        backoff = Math.min(backoff * 2, MAX_BACKOFF_MS);
       };
 
-      socket.current.onerror = (error) => {
+      ws.onerror = (error) => {
+        // onclose follows and schedules the reconnect
         console.error('WebSocket error:', error);
-        setReadyState(WebSocket.CLOSED);
       };
-    }
+    };
+
+    connect();
 
     return () => {
+      stopped = true;
+      clearTimeout(retry);
       if (socket.current) {
         socket.current.close();
         socket.current = null;
       }
     };
-  }, [url, onMessage]);
+  }, [url, onMessage, onResync]);
 
   const sendMessage = (message) => {
     if (socket.current && socket.current.readyState === WebSocket.OPEN) {
@@ -58,4 +116,4 @@ const useWebSocket = (url, onMessage) => {
   return { sendMessage, readyState };
 };
 
-export default useWebSocket;
\ No newline at end of file
+export default useWebSocket;
@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+"""
+LLM 调用录制/回放 (cassette)，让实验以 CPU 速度、相同输出重复运行。
+- RecordingLLM 包裹任意 llm_callable，把 (prompt, role, output, latency) 追加写入 cassette 文件
+- 数据文件为 append-only JSON Lines；旁路索引 <path>.idx 每行 "key\\toffset\\tlength"
+- ReplayLLM 按 (role, prompt) 与出现次序回放；默认立即返回，可选按录制延迟回放
+
+用法:
+    llm = RecordingLLM(get_llm_with_fallback(), "results/city.cassette")
+    ...
+    llm = ReplayLLM("results/city.cassette")                      # 全速
+    llm = ReplayLLM("results/city.cassette", realtime=True)       # 按录制延迟
+"""
+
+from __future__ import annotations
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+LLMCallable = Callable[[str, Optional[str]], str]
+
+
+def cassette_key(prompt: str, role: Optional[str]) -> str:
+    h = hashlib.sha1()
+    h.update((role or "").encode("utf-8"))
+    h.update(b"\x00")
+    h.update(prompt.encode("utf-8"))
+    return h.hexdigest()[:32]
+
+
+class CassetteMiss(KeyError):
+    """Replay found no recording for (role, prompt) and no fallback is configured."""
+
+
+class RecordingLLM:
+    """Pass-through llm_callable that appends every call to a cassette file."""
+
+    def __init__(self, llm: LLMCallable, path: str):
+        self.llm = llm
+        self.path = path
+        d = os.path.dirname(os.path.abspath(path))
+        os.makedirs(d, exist_ok=True)
+        self._lock = threading.Lock()
+        self._data = open(path, "ab")
+        self._idx = open(path + ".idx", "a", encoding="utf-8")
+
+    def __call__(self, prompt: str, role: Optional[str] = None) -> str:
+        t0 = time.perf_counter()
+        try:
+            out = self.llm(prompt, role)
+        except Exception as e:
+            self._append(prompt, role, None, (time.perf_counter() - t0) * 1000.0, f"{type(e).__name__}: {e}")
+            raise
+        self._append(prompt, role, out, (time.perf_counter() - t0) * 1000.0, None)
+        return out
+
+    def _append(self, prompt: str, role: Optional[str], output: Optional[str], latency_ms: float, error: Optional[str]):
+        key = cassette_key(prompt, role)
+        rec = {"k": key, "role": role, "prompt": prompt, "output": output, "latency_ms": round(latency_ms, 3)}
+        if error is not None:
+            rec["error"] = error
+        line = (json.dumps(rec, ensure_ascii=False) + "\n").encode("utf-8")
+        with self._lock:
+            off = self._data.tell()
+            self._data.write(line)
+            self._data.flush()
+            self._idx.write(f"{key}\t{off}\t{len(line)}\n")
+            self._idx.flush()
+
+    def close(self):
+        with self._lock:
+            self._data.close()
+            self._idx.close()
+
+
+class ReplayLLM:
+    """
+    llm_callable that serves recorded outputs. The n-th call for a (role, prompt)
+    returns the n-th recording (the last one once exhausted). Recorded errors are re-raised.
+    """
+
+    def __init__(self, path: str, realtime: bool = False, time_scale: float = 1.0,
+                 fallback: Optional[LLMCallable] = None):
+        self.path = path
+        self.realtime = realtime
+        self.time_scale = time_scale
+        self.fallback = fallback
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._seen: Dict[str, int] = {}
+        self._index: Dict[str, List[Tuple[int, int]]] = self._load_index()
+        self._fd = os.open(path, os.O_RDONLY)
+
+    def _load_index(self) -> Dict[str, List[Tuple[int, int]]]:
+        index: Dict[str, List[Tuple[int, int]]] = {}
+        size = os.path.getsize(self.path)
+        idx_path = self.path + ".idx"
+        if os.path.exists(idx_path):
+            with open(idx_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    parts = line.rstrip("\n").split("\t")
+                    if len(parts) != 3:
+                        continue  # torn last line from an interrupted recording
+                    off, n = int(parts[1]), int(parts[2])
+                    if off + n <= size:
+                        index.setdefault(parts[0], []).append((off, n))
+            return index
+        # no sidecar index: rebuild it by scanning the data file once
+        with open(self.path, "rb") as f:
+            off = 0
+            for raw in f:
+                if raw.endswith(b"\n"):
+                    try:
+                        key = json.loads(raw)["k"]
+                    except (ValueError, KeyError):
+                        key = None
+                    if key:
+                        index.setdefault(key, []).append((off, len(raw)))
+                off += len(raw)
+        return index
+
+    def __len__(self) -> int:
+        return sum(len(v) for v in self._index.values())
+
+    def __call__(self, prompt: str, role: Optional[str] = None) -> str:
+        key = cassette_key(prompt, role)
+        with self._lock:
+            entries = self._index.get(key)
+            n = self._seen.get(key, 0)
+            self._seen[key] = n + 1
+            if entries:
+                self.hits += 1
+            else:
+                self.misses += 1
+        if not entries:
+            if self.fallback is not None:
+                return self.fallback(prompt, role)
+            raise CassetteMiss(f"no recording for role={role!r} prompt={prompt[:60]!r}")
+        off, length = entries[min(n, len(entries) - 1)]
+        rec = json.loads(os.pread(self._fd, length, off))
+        if self.realtime and self.time_scale > 0:
+            time.sleep(rec.get("latency_ms", 0.0) * self.time_scale / 1000.0)
+        if rec.get("error"):
+            raise RuntimeError(f"[replayed] {rec['error']}")
+        return rec["output"]
+
+    def close(self):
+        os.close(self._fd)
+
+
+def wrap_llm(llm: Optional[LLMCallable], *, record: Optional[str] = None, replay: Optional[str] = None,
+             realtime: bool = False) -> Optional[LLMCallable]:
+    """Apply --record/--replay style options to an llm_callable (replay wins if both are given)."""
+    if replay:
+        return ReplayLLM(replay, realtime=realtime)
+    if record:
+        if llm is None:
+            raise ValueError("recording needs an llm to wrap")
+        return RecordingLLM(llm, record)
+    return llm
@@ -0,0 +1,267 @@
+# -*- coding: utf-8 -*-
+"""
+Deterministic local mock LLM for offline, reproducible benchmarks.
+- 延迟分布可配置且可复现：fixed / lognormal / bimodal，含首 token 时间 (TTFT) 与流式分片节奏
+- 支持错误注入与限流响应（HTTP 500 / 429 + Retry-After；Spark 帧 header.code != 0）
+- 同一 (seed, role, prompt, 第 n 次调用) 总是得到相同的延迟、分片与错误决定，与并发交错无关
+
+三种用法：
+    # 1) 进程内 callable（无网络），兼容 dsl.use_llm
+    from integrations.mock_llm import MockLLM
+    dsl.use_llm(MockLLM.from_spec("lognormal:40,0.6", seed=7))
+
+    # 2) 本地服务：DeepSeek 兼容 HTTP + Spark X1 兼容 WebSocket
+    PYTHONPATH=. python integrations/mock_llm.py --port 9100 --latency bimodal:0.1,30,400 --error-rate 0.02
+
+    # 3) 让现有客户端指向它
+    DEEPSEEK_API_KEY=x DEEPSEEK_BASE_URL=http://127.0.0.1:9100/v1/chat/completions
+    SPARK_APP_ID=x SPARK_API_KEY=x SPARK_API_SECRET=x SPARK_X1_URL=ws://127.0.0.1:9100/v1/x1
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+
+class LatencyModel:
+    """Seeded latency distribution in milliseconds, parsed from a short spec string."""
+
+    def __init__(self, kind: str, params: Tuple[float, ...]):
+        self.kind = kind
+        self.params = params
+
+    @classmethod
+    def parse(cls, spec: str) -> "LatencyModel":
+        """
+        fixed:MS | lognormal:MEDIAN_MS,SIGMA | bimodal:P_SLOW,FAST_MS,SLOW_MS[,SIGMA]
+        """
+        kind, _, rest = spec.partition(":")
+        params = tuple(float(x) for x in rest.split(",") if x.strip())
+        need = {"fixed": 1, "lognormal": 2, "bimodal": 3}
+        if kind not in need or len(params) < need[kind]:
+            raise ValueError(f"bad latency spec {spec!r}; expected fixed:MS, lognormal:MEDIAN,SIGMA or bimodal:P,FAST,SLOW[,SIGMA]")
+        return cls(kind, params)
+
+    def sample(self, rng: random.Random) -> float:
+        if self.kind == "fixed":
+            return max(0.0, self.params[0])
+        if self.kind == "lognormal":
+            median, sigma = self.params[:2]
+            return median * math.exp(sigma * rng.gauss(0.0, 1.0))
+        p_slow, fast, slow = self.params[:3]
+        sigma = self.params[3] if len(self.params) > 3 else 0.25
+        center = slow if rng.random() < p_slow else fast
+        return center * math.exp(sigma * rng.gauss(0.0, 1.0))
+
+    def __repr__(self) -> str:
+        return f"{self.kind}:{','.join(f'{p:g}' for p in self.params)}"
+
+
+@dataclass
+class MockResponsePlan:
+    """Everything one mock call will do, decided up front from the seeded RNG."""
+    outcome: str                 # "ok" | "error" | "rate_limit"
+    ttft_ms: float
+    chunks: List[str]
+    chunk_gap_ms: float
+    retry_after_s: float = 1.0
+
+    @property
+    def total_ms(self) -> float:
+        return self.ttft_ms + self.chunk_gap_ms * max(0, len(self.chunks) - 1)
+
+    @property
+    def text(self) -> str:
+        return "".join(self.chunks)
+
+
+class MockLLMBehavior:
+    """
+    Shared decision logic for the in-process callable and the HTTP/WS server.
+    `latency` models total time to first token; `chunk_gap_ms` is the streaming cadence.
+    """
+
+    def __init__(self, seed: int = 7, latency: Optional[LatencyModel] = None,
+                 chunk_chars: int = 8, chunk_gap_ms: float = 0.0,
+                 error_rate: float = 0.0, rate_limit_rate: float = 0.0, retry_after_s: float = 1.0,
+                 template: str = "[{role}]OK:{tail}"):
+        self.seed = seed
+        self.latency = latency or LatencyModel("fixed", (0.0,))
+        self.chunk_chars = max(1, int(chunk_chars))
+        self.chunk_gap_ms = chunk_gap_ms
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after_s = retry_after_s
+        self.template = template
+        self._seen: Dict[Tuple[Optional[str], str], int] = {}
+        self._lock = threading.Lock()
+
+    def plan(self, prompt: str, role: Optional[str] = None) -> MockResponsePlan:
+        key = (role, prompt)
+        with self._lock:
+            n = self._seen.get(key, 0)
+            self._seen[key] = n + 1
+        # per-(prompt, occurrence) stream: reproducible regardless of request interleaving
+        rng = random.Random(f"{self.seed}|{role}|{n}|{prompt}")
+        ttft = self.latency.sample(rng)
+        u = rng.random()
+        if u < self.rate_limit_rate:
+            return MockResponsePlan("rate_limit", min(ttft, 5.0), [], 0.0, self.retry_after_s)
+        if u < self.rate_limit_rate + self.error_rate:
+            return MockResponsePlan("error", ttft, [], 0.0)
+        text = self.template.format(role=role, tail=prompt[-16:], prompt=prompt, n=n)
+        step = self.chunk_chars
+        chunks = [text[i:i + step] for i in range(0, len(text), step)] or [""]
+        return MockResponsePlan("ok", ttft, chunks, self.chunk_gap_ms)
+
+
+class MockLLMError(RuntimeError):
+    """Injected provider failure; `rate_limited` distinguishes 429-style rejections."""
+
+    def __init__(self, message: str, rate_limited: bool = False, retry_after_s: float = 0.0):
+        super().__init__(message)
+        self.rate_limited = rate_limited
+        self.retry_after_s = retry_after_s
+
+
+class MockLLM:
+    """In-process llm_callable (prompt, role) -> str with the same latency/error behavior as the server."""
+
+    def __init__(self, behavior: Optional[MockLLMBehavior] = None, time_scale: float = 1.0):
+        self.behavior = behavior or MockLLMBehavior()
+        self.time_scale = time_scale
+
+    @classmethod
+    def from_spec(cls, latency: str, seed: int = 7, time_scale: float = 1.0, **kwargs) -> "MockLLM":
+        return cls(MockLLMBehavior(seed=seed, latency=LatencyModel.parse(latency), **kwargs), time_scale=time_scale)
+
+    def __call__(self, prompt: str, role: Optional[str] = None) -> str:
+        plan = self.behavior.plan(prompt, role)
+        if self.time_scale > 0:
+            time.sleep(plan.total_ms * self.time_scale / 1000.0)
+        if plan.outcome == "rate_limit":
+            raise MockLLMError("mock rate limit", rate_limited=True, retry_after_s=plan.retry_after_s)
+        if plan.outcome == "error":
+            raise MockLLMError("mock provider error")
+        return plan.text
+
+
+# ---------- HTTP / WebSocket server ----------
+
+SPARK_RATE_LIMIT_CODE = 11202
+SPARK_ERROR_CODE = 10500
+
+
+def _chat_prompt(messages: List[Dict[str, str]]) -> Tuple[Optional[str], str]:
+    role = next((m.get("content") for m in messages if m.get("role") == "system"), None)
+    prompt = "\n".join(m.get("content", "") for m in messages if m.get("role") == "user")
+    return role, prompt
+
+
+def create_app(behavior: MockLLMBehavior):
+    """FastAPI app exposing DeepSeek/OpenAI-style chat completions and the Spark X1 WebSocket."""
+    from fastapi import FastAPI, Request, WebSocket, WebSocketDisconnect
+    from fastapi.responses import JSONResponse, StreamingResponse
+
+    app = FastAPI(title="Mock LLM", version="1.0.0")
+
+    @app.get("/health")
+    def health():
+        return {"ok": True, "latency": repr(behavior.latency), "seed": behavior.seed}
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        role, prompt = _chat_prompt(body.get("messages", []))
+        plan = behavior.plan(prompt, role)
+        await asyncio.sleep(plan.ttft_ms / 1000.0)
+        if plan.outcome == "rate_limit":
+            return JSONResponse({"error": {"message": "rate limit", "type": "rate_limit_exceeded"}},
+                                status_code=429, headers={"Retry-After": f"{plan.retry_after_s:g}"})
+        if plan.outcome == "error":
+            return JSONResponse({"error": {"message": "injected error", "type": "server_error"}}, status_code=500)
+        model = body.get("model", "mock")
+        if not body.get("stream"):
+            await asyncio.sleep(plan.chunk_gap_ms * max(0, len(plan.chunks) - 1) / 1000.0)
+            return {
+                "id": "mock", "object": "chat.completion", "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": plan.text}, "finish_reason": "stop"}],
+            }
+
+        async def _sse():
+            for i, chunk in enumerate(plan.chunks):
+                if i:
+                    await asyncio.sleep(plan.chunk_gap_ms / 1000.0)
+                delta = {"id": "mock", "object": "chat.completion.chunk", "model": model,
+                         "choices": [{"index": 0, "delta": {"content": chunk}, "finish_reason": None}]}
+                yield f"data: {json.dumps(delta, ensure_ascii=False)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(_sse(), media_type="text/event-stream")
+
+    @app.websocket("/v1/x1")
+    async def spark_x1(ws: WebSocket):
+        # auth query params are accepted and ignored
+        await ws.accept()
+        try:
+            req = json.loads(await ws.receive_text())
+            texts = req.get("payload", {}).get("message", {}).get("text", [])
+            role, prompt = _chat_prompt(texts)
+            plan = behavior.plan(prompt, role)
+            await asyncio.sleep(plan.ttft_ms / 1000.0)
+            if plan.outcome != "ok":
+                code = SPARK_RATE_LIMIT_CODE if plan.outcome == "rate_limit" else SPARK_ERROR_CODE
+                await ws.send_text(json.dumps({"header": {"code": code, "message": plan.outcome, "status": 2}}))
+                return
+            last = len(plan.chunks) - 1
+            for i, chunk in enumerate(plan.chunks):
+                if i:
+                    await asyncio.sleep(plan.chunk_gap_ms / 1000.0)
+                status = 2 if i == last else (0 if i == 0 else 1)
+                frame = {
+                    "header": {"code": 0, "message": "Success", "status": status},
+                    "payload": {"choices": {"status": status, "seq": i,
+                                            "text": [{"role": "assistant", "content": chunk, "index": 0}]}},
+                }
+                await ws.send_text(json.dumps(frame, ensure_ascii=False))
+        except WebSocketDisconnect:
+            return
+        finally:
+            try:
+                await ws.close()
+            except Exception:
+                pass
+
+    return app
+
+
+def main():
+    ap = argparse.ArgumentParser("mock-llm")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=9100)
+    ap.add_argument("--seed", type=int, default=7)
+    ap.add_argument("--latency", default="lognormal:40,0.5", help="TTFT distribution, e.g. fixed:50 | lognormal:40,0.5 | bimodal:0.1,30,400")
+    ap.add_argument("--chunk-chars", type=int, default=8)
+    ap.add_argument("--chunk-gap-ms", type=float, default=5.0)
+    ap.add_argument("--error-rate", type=float, default=0.0)
+    ap.add_argument("--rate-limit-rate", type=float, default=0.0)
+    ap.add_argument("--retry-after-s", type=float, default=1.0)
+    args = ap.parse_args()
+
+    import uvicorn
+    behavior = MockLLMBehavior(
+        seed=args.seed, latency=LatencyModel.parse(args.latency),
+        chunk_chars=args.chunk_chars, chunk_gap_ms=args.chunk_gap_ms,
+        error_rate=args.error_rate, rate_limit_rate=args.rate_limit_rate, retry_after_s=args.retry_after_s,
+    )
+    uvicorn.run(create_app(behavior), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
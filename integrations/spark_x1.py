@@ -31,7 +31,8 @@ def _assemble_auth_url(api_url: str, api_key: str, api_secret: str) -> str:
     签名字符串采用 "host/date/request-line" 规范（若你的控制台示例有差异，请按示例微调）。
     """
     parsed = urllib.parse.urlparse(api_url)
-    assert parsed.scheme == "wss", "Spark API must be wss"
+    # ws:// is only expected for the local mock server (integrations/mock_llm.py)
+    assert parsed.scheme in ("wss", "ws"), "Spark API must be wss"
     host = parsed.netloc
     path = parsed.path
     date = _rfc1123_gmt_now()
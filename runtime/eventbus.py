@@ -1,43 +1,669 @@
 
 from __future__ import annotations
-from typing import Any, Callable, Dict, List
-import threading, queue
+from typing import TYPE_CHECKING, Any, Callable, Dict, Hashable, List, Optional, Tuple, Union
+import threading, queue, zlib, os, pickle, struct, tempfile, itertools, logging, time, asyncio, heapq
+from collections import deque
+
+from runtime.predicates import PredicateIndex
+from utils.counters import ShardedCounter
+
+if TYPE_CHECKING:
+    from runtime.eventlog import EventLogWriter
+
+logger = logging.getLogger(__name__)
+
+class _TrieNode:
+    __slots__ = ("children", "subs", "filters")
+
+    def __init__(self):
+        self.children: Dict[str, _TrieNode] = {}
+        self.subs: List[Callable[[Any], None]] = []
+        self.filters: Optional[PredicateIndex] = None  # subscriptions with where= on this pattern
+
+class TopicTrie:
+    """
+    Subscription index over dot-separated topics (``city.traffic.incident``).
+    Patterns may use ``*`` for exactly one segment and ``#`` for zero or more segments,
+    so ``city.*.incident`` and ``city.#`` both match the topic above. match() walks the
+    trie segment by segment: its cost depends on topic depth and on how many wildcard
+    branches exist, not on the total number of subscriptions. Subscriptions with a
+    `where` filter are kept in a PredicateIndex on their node and only returned for
+    payloads that satisfy it. Not thread-safe on its own.
+    """
+    def __init__(self):
+        self._root = _TrieNode()
+
+    @staticmethod
+    def split(topic: str) -> Tuple[str, ...]:
+        return tuple(topic.split("."))
+
+    def add(self, pattern: str, fn: Callable[[Any], None], where: Optional[Dict[str, Any]] = None):
+        node = self._root
+        for seg in self.split(pattern):
+            node = node.children.setdefault(seg, _TrieNode())
+        if where:
+            if node.filters is None:
+                node.filters = PredicateIndex()
+            node.filters.add(fn, where)
+        else:
+            node.subs.append(fn)
+
+    def remove(self, pattern: str, fn: Callable[[Any], None]) -> bool:
+        path = [self._root]
+        for seg in self.split(pattern):
+            nxt = path[-1].children.get(seg)
+            if nxt is None:
+                return False
+            path.append(nxt)
+        last = path[-1]
+        try:
+            last.subs.remove(fn)
+        except ValueError:
+            if last.filters is None or not last.filters.remove(fn):
+                return False
+            if not last.filters:
+                last.filters = None
+        # prune branches left empty
+        for parent, seg, node in zip(reversed(path[:-1]), reversed(self.split(pattern)), reversed(path[1:])):
+            if node.subs or node.filters or node.children:
+                break
+            del parent.children[seg]
+        return True
+
+    def match(self, topic: str, payload: Any = None) -> List[Callable[[Any], None]]:
+        """Subscribers of every pattern matching `topic`; filtered ones only when `payload` satisfies them."""
+        segs = self.split(topic)
+        n = len(segs)
+        hits: Dict[int, _TrieNode] = {}  # terminal nodes, deduped when several paths reach one
+        stack = [(self._root, 0)]
+        while stack:
+            node, i = stack.pop()
+            multi = node.children.get("#")
+            if multi is not None:
+                for j in range(i, n + 1):  # '#' swallows segs[i:j]
+                    stack.append((multi, j))
+            if i == n:
+                if node.subs or node.filters is not None:
+                    hits[id(node)] = node
+                continue
+            exact = node.children.get(segs[i])
+            if exact is not None:
+                stack.append((exact, i + 1))
+            single = node.children.get("*")
+            if single is not None and single is not exact:
+                stack.append((single, i + 1))
+        out: List[Callable[[Any], None]] = []
+        for node in hits.values():
+            out.extend(node.subs)
+            if node.filters is not None:
+                out.extend(node.filters.select(payload))
+        return out
+
+class _LoopBridge:
+    """
+    Hands events from bus worker threads to one asyncio loop in batches: pushes go onto
+    a deque and at most one call_soon_threadsafe wakeup is pending at a time, so a burst
+    of N events costs one loop wakeup instead of N. Coroutines are started in push order.
+    """
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self._pending: "deque[tuple[Callable[[Any], Any], Any]]" = deque()
+        self._lock = threading.Lock()
+        self._scheduled = False
+        self.batches = 0
+        self.started = 0
+        self.errors = 0
+        self.dropped = 0
+
+    def push(self, fn: Callable[[Any], Any], payload: Any):
+        self._pending.append((fn, payload))
+        with self._lock:
+            if self._scheduled:
+                return
+            self._scheduled = True
+        try:
+            self.loop.call_soon_threadsafe(self._drain)
+        except RuntimeError:  # loop closed
+            with self._lock:
+                self._scheduled = False
+            self.dropped += len(self._pending)
+            self._pending.clear()
+
+    def _drain(self):
+        with self._lock:
+            self._scheduled = False
+        self.batches += 1
+        pending = self._pending
+        while pending:
+            fn, payload = pending.popleft()
+            try:
+                task = self.loop.create_task(fn(payload))
+            except Exception:
+                self.errors += 1
+                logger.exception("EventBus async subscriber %r failed to start", fn)
+                continue
+            task.add_done_callback(self._done)
+            self.started += 1
+
+    def _done(self, task: "asyncio.Task"):
+        if not task.cancelled() and task.exception() is not None:
+            self.errors += 1
+            logger.error("EventBus async subscriber failed", exc_info=task.exception())
+
+class _AsyncSubscriber:
+    """Trie entry for a coroutine subscriber; compares equal to the coroutine function for unsubscribe()."""
+    __slots__ = ("fn", "bridge")
+
+    def __init__(self, fn: Callable[[Any], Any], bridge: _LoopBridge):
+        self.fn = fn
+        self.bridge = bridge
+
+    def __call__(self, payload: Any):
+        self.bridge.push(self.fn, payload)
+
+    def __eq__(self, other):
+        return other is self or other == self.fn
+
+    __hash__ = object.__hash__
+
+    def __repr__(self):
+        return f"<async {self.fn!r}>"
+
+class _BatchSubscriber:
+    """
+    Trie entry buffering payloads for a list-taking subscriber. A batch is flushed when
+    it reaches `max_batch` entries (on the delivering worker) or `max_latency_s` after its
+    first event (the bus's batch timer asks the partition worker that delivered that
+    event to flush, so a slow handler never holds up the timer). With `key`, only the latest payload per key is
+    kept in the pending batch, in first-seen order. Flushes of one subscriber never overlap.
+    """
+    def __init__(self, fn: Callable[[List[Any]], Any], max_batch: int, max_latency_s: float,
+                 key: Optional[Callable[[Any], Hashable]], timer: "_BatchTimer",
+                 bridge: Optional[_LoopBridge] = None):
+        self.fn = fn
+        self.max_batch = max(1, int(max_batch))
+        self.max_latency_s = max_latency_s
+        self.key = key
+        self.timer = timer
+        self.bridge = bridge
+        self._lock = threading.Lock()
+        self._items: List[Any] = []
+        self._keyed: Dict[Hashable, Any] = {}
+        self._deadline: Optional[float] = None
+        self._owner: Optional["_Partition"] = None  # partition worker that started the pending batch
+        self.flushes = 0
+        self.coalesced = 0
+        self.errors = 0
+
+    def __call__(self, payload: Any):
+        with self._lock:
+            if self.key is not None:
+                k = self.key(payload)
+                if k in self._keyed:
+                    self.coalesced += 1
+                self._keyed[k] = payload
+                n = len(self._keyed)
+            else:
+                self._items.append(payload)
+                n = len(self._items)
+            if n >= self.max_batch:
+                self._flush_locked()
+            elif self._deadline is None:
+                self._deadline = time.monotonic() + self.max_latency_s
+                self._owner = getattr(_worker, "part", None)
+                self.timer.schedule(self._deadline, self)
+
+    def flush(self, deadline: Optional[float] = None):
+        """Flush now; with `deadline`, only if that timer is still the current one."""
+        with self._lock:
+            if deadline is None or deadline == self._deadline:
+                self._flush_locked()
+
+    def due(self, deadline: float):
+        """Timer callback: hand the flush to the owning partition worker (or run it here without one)."""
+        owner = self._owner
+        if owner is None:
+            self.flush(deadline)
+        else:
+            owner.request_flush(self, deadline)
+
+    def _flush_locked(self):
+        self._deadline = None
+        if self.key is not None:
+            if not self._keyed:
+                return
+            batch = list(self._keyed.values())
+            self._keyed = {}
+        else:
+            if not self._items:
+                return
+            batch, self._items = self._items, []
+        self.flushes += 1
+        if self.bridge is not None:
+            self.bridge.push(self.fn, batch)
+            return
+        try:
+            self.fn(batch)
+        except Exception:
+            self.errors += 1
+            logger.exception("EventBus batch subscriber %r failed", self.fn)
+
+    def __eq__(self, other):
+        return other is self or other == self.fn
+
+    __hash__ = object.__hash__
+
+    def __repr__(self):
+        return f"<batch {self.fn!r}>"
+
+class _BatchTimer:
+    """One daemon thread signalling batch subscribers whose max latency has expired."""
+    def __init__(self):
+        self._heap: List[Tuple[float, int, _BatchSubscriber]] = []
+        self._seq = itertools.count()
+        self._cv = threading.Condition()
+        self._stop = False
+        self._th = threading.Thread(target=self._loop, daemon=True, name="eventbus-batch")
+        self._th.start()
+
+    def schedule(self, deadline: float, sub: _BatchSubscriber):
+        with self._cv:
+            heapq.heappush(self._heap, (deadline, next(self._seq), sub))
+            if self._heap[0][2] is sub:
+                self._cv.notify()
+
+    def _loop(self):
+        while True:
+            with self._cv:
+                while not self._stop and (not self._heap or self._heap[0][0] > time.monotonic()):
+                    self._cv.wait(timeout=(self._heap[0][0] - time.monotonic()) if self._heap else None)
+                if self._stop:
+                    return
+                deadline, _, sub = heapq.heappop(self._heap)
+            sub.due(deadline)
+
+    def stop(self):
+        with self._cv:
+            self._stop = True
+            self._cv.notify()
+        self._th.join(timeout=0.5)
+
+# what publish() can do with an event when a partition queue is full
+OVERFLOW_POLICIES = ("drop_newest", "drop_oldest", "block", "sample", "spill")
+# per-partition outcome counters; the first two accept the event, the rest lose it
+ACCEPTED = ("enqueued", "spilled")
+LOST = ("dropped_newest", "dropped_oldest", "block_timeout", "sampled_out", "spill_failed")
+_LEN = struct.Struct(">I")
+# queued to wake an idle partition worker for batch flushes; never delivered
+_WAKE = ("", None)
+# set on partition worker threads: _worker.part is the partition being drained
+_worker = threading.local()
+
+class _Partition:
+    """One bounded queue drained by one worker thread, plus its optional spill file."""
+    def __init__(self, index: int, max_queue: int):
+        self.index = index
+        self.max_queue = max_queue
+        self.q: "queue.Queue[tuple[str, Any]]" = queue.Queue(maxsize=max_queue)
+        self.outcomes = {k: ShardedCounter() for k in ACCEPTED + LOST + ("blocked",)}
+        self.delivered = 0  # only this partition's worker writes these two
+        self.replayed = 0
+        self.subscriber_errors = 0
+        self.thread: threading.Thread | None = None
+        self.sample_seq = itertools.count()
+        # spill state, guarded by spill_lock
+        self.spill_lock = threading.Lock()
+        self.spill_file = None
+        self.spill_read = 0
+        self.spilling = False
+        # (batch subscriber, deadline) whose timer fired; flushed by this partition's worker
+        self.due: "deque[Tuple[_BatchSubscriber, float]]" = deque()
+
+    def request_flush(self, sub: _BatchSubscriber, deadline: float):
+        self.due.append((sub, deadline))
+        if self.q.empty():  # a busy worker checks `due` after every event anyway
+            try:
+                self.q.put_nowait(_WAKE)
+            except queue.Full:
+                pass
+
+    def flush_due(self):
+        while self.due:
+            sub, deadline = self.due.popleft()
+            sub.flush(deadline)
+
+    def stats(self) -> Dict[str, Any]:
+        out = {k: c.value() for k, c in self.outcomes.items()}
+        return {
+            "partition": self.index,
+            "queue_depth": self.q.qsize(),
+            "queue_capacity": self.max_queue,
+            "published": sum(out[k] for k in ACCEPTED),
+            "dropped": sum(out[k] for k in LOST),
+            "delivered": self.delivered,
+            "replayed": self.replayed,
+            "subscriber_errors": self.subscriber_errors,
+            "spill_backlog_bytes": (self.spill_file.tell() - self.spill_read) if self.spilling else 0,
+            "outcomes": out,
+        }
 
 class EventBus:
-    """Single background worker + bounded queue to avoid thread explosions."""
-    def __init__(self, max_queue:int=8192):
-        self._subs: Dict[str, List[Callable[[Any], None]]] = {}
+    """
+    Bounded queue(s) drained by background worker(s) to avoid thread explosions.
+    With partitions > 1 every topic is hashed (crc32) onto one partition, so events of
+    a topic are still delivered in publish order while different topics run in parallel
+    and a slow subscriber only stalls the topics sharing its partition.
+    `max_queue` is per partition.
+
+    `overflow` picks what happens when a partition queue is full:
+      drop_newest  discard the event being published (the historical behaviour)
+      drop_oldest  evict the oldest queued event to make room
+      block        wait up to `block_timeout_s` for room, then discard
+      sample       once the queue is `sample_above` full, admit only every `sample_every`-th event
+      spill        append to a per-partition file under `spill_dir`; the worker replays it,
+                   in order, once the queue drains (later events spill too until then)
+    Each outcome is counted per partition (see stats()). Subscriber exceptions are
+    counted and logged instead of being swallowed.
+
+    With `event_log` (runtime.eventlog.EventLogWriter) every published event is
+    appended to the durable log before the overflow policy applies, so the log is
+    complete even when the in-memory queues shed load. With a `transport`
+    (runtime.transport.UnixSocketTransport.attach) published events are also sent to
+    the other processes sharing the broker; their events arrive through publish_local().
+    """
+    def __init__(self, max_queue:int=8192, partitions:int=1, overflow:str="drop_newest",
+                 block_timeout_s:float=0.1, sample_every:int=10, sample_above:float=0.8,
+                 spill_dir:Optional[str]=None, event_log:Optional["EventLogWriter"]=None):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"unknown overflow policy {overflow!r}; expected one of {OVERFLOW_POLICIES}")
+        self._subs = TopicTrie()
         self._lock = threading.RLock()
-        self._q: "queue.Queue[tuple[str, Any]]" = queue.Queue(maxsize=max_queue)
+        self._bridges: Dict[asyncio.AbstractEventLoop, _LoopBridge] = {}
+        self._batches: List[_BatchSubscriber] = []
+        self._batch_timer: Optional[_BatchTimer] = None
+        self.max_queue = max_queue
+        self.overflow = overflow
+        self.block_timeout_s = block_timeout_s
+        self.sample_every = max(1, int(sample_every))
+        self._sample_high = max(1, int(max_queue * sample_above))
+        self._parts = [_Partition(i, max_queue) for i in range(max(1, int(partitions)))]
+        if overflow == "spill":
+            spill_dir = spill_dir or tempfile.mkdtemp(prefix="eventbus-spill-")
+            os.makedirs(spill_dir, exist_ok=True)
+            for p in self._parts:
+                # pid in the name: worker processes may share EVENTBUS_SPILL_DIR
+                p.spill_file = open(os.path.join(spill_dir, f"partition-{p.index}-{os.getpid()}.spill"), "w+b")
+        self.spill_dir = spill_dir
+        self.event_log = event_log
+        self.transport = None
         self._stop = threading.Event()
-        self._th = threading.Thread(target=self._loop, daemon=True)
-        self._th.start()
+        for p in self._parts:
+            p.thread = threading.Thread(target=self._loop, args=(p,), daemon=True, name=f"eventbus-{p.index}")
+            p.thread.start()
 
-    def _loop(self):
-        while not self._stop.is_set():
+    @property
+    def partitions(self) -> int:
+        return len(self._parts)
+
+    def partition_for(self, topic: str) -> int:
+        if len(self._parts) == 1:
+            return 0
+        return zlib.crc32(topic.encode("utf-8")) % len(self._parts)
+
+    def _deliver(self, part: _Partition, topic: str, payload: Any):
+        with self._lock:
+            fns = self._subs.match(topic, payload)
+        for fn in fns:
             try:
-                topic, payload = self._q.get(timeout=0.1)
-            except queue.Empty:
-                continue
-            with self._lock:
-                fns = list(self._subs.get(topic, []))
-            for fn in fns:
+                fn(payload)
+            except Exception:
+                part.subscriber_errors += 1
+                logger.exception("EventBus subscriber %r failed on topic %r", fn, topic)
+        part.delivered += 1
+
+    def _loop(self, part: _Partition):
+        q = part.q
+        _worker.part = part
+        try:
+            while not self._stop.is_set():
+                if part.due:
+                    part.flush_due()
                 try:
-                    fn(payload)
-                except Exception:
-                    pass
-            self._q.task_done()
+                    item = q.get(timeout=0.01 if part.spilling else 0.1)
+                except queue.Empty:
+                    if part.spilling:
+                        self._replay_spill(part)
+                    continue
+                if item is not _WAKE:
+                    self._deliver(part, *item)
+                q.task_done()
+        finally:
+            self._close_spill(part)  # here, not in shutdown(): a replay may still be running
+
+    # ---------- spill ----------
+    def _spill(self, part: _Partition, topic: str, payload: Any):
+        try:
+            blob = pickle.dumps((topic, payload), protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception:
+            part.outcomes["spill_failed"].add()
+            logger.warning("EventBus could not spill an event on topic %r (payload not picklable)", topic)
+            return
+        with part.spill_lock:
+            f = part.spill_file
+            if f.closed:
+                part.outcomes["spill_failed"].add()
+                return
+            f.seek(0, os.SEEK_END)
+            f.write(_LEN.pack(len(blob)) + blob)
+            f.flush()
+            part.spilling = True
+        part.outcomes["spilled"].add()
 
-    def subscribe(self, topic: str, fn: Callable[[Any], None]):
+    def _close_spill(self, part: _Partition):
+        """Close the spill file; removed when fully replayed, kept (and reported) otherwise."""
+        with part.spill_lock:
+            f = part.spill_file
+            if f is None or f.closed:
+                return
+            f.seek(0, os.SEEK_END)
+            backlog = f.tell() - part.spill_read
+            part.spilling = False
+            f.close()
+        if backlog:
+            logger.warning("EventBus partition %d stopped with %d spilled bytes not replayed; left in %s",
+                           part.index, backlog, f.name)
+        else:
+            try:
+                os.unlink(f.name)
+            except OSError:
+                pass
+
+    def _replay_spill(self, part: _Partition, max_bytes: int = 1 << 20):
+        """Deliver spilled events oldest-first; runs on the partition worker only."""
+        with part.spill_lock:
+            end = part.spill_file.tell()
+            if part.spill_read >= end:
+                part.spill_file.seek(0)
+                part.spill_file.truncate()
+                part.spill_read = 0
+                part.spilling = False
+                return
+            buf = os.pread(part.spill_file.fileno(), min(end - part.spill_read, max_bytes), part.spill_read)
+        off = 0
+        while off + _LEN.size <= len(buf) and not self._stop.is_set():
+            (n,) = _LEN.unpack_from(buf, off)
+            if off + _LEN.size + n > len(buf):
+                if off == 0:  # single record larger than max_bytes
+                    buf = os.pread(part.spill_file.fileno(), _LEN.size + n, part.spill_read)
+                    continue
+                break
+            topic, payload = pickle.loads(buf[off + _LEN.size: off + _LEN.size + n])
+            off += _LEN.size + n
+            self._deliver(part, topic, payload)
+            part.replayed += 1
+            if part.due:
+                part.flush_due()
+        with part.spill_lock:
+            part.spill_read += off
+
+    # ---------- pub/sub ----------
+    def subscribe(self, topic: str, fn: Callable[[Any], Any], loop: Optional[asyncio.AbstractEventLoop] = None,
+                  where: Optional[Dict[str, Any]] = None):
+        """
+        `topic` may be a pattern with `*` (one segment) / `#` (any number of segments).
+        Coroutine functions run as tasks on `loop` (default: the caller's running loop),
+        fed through one batched bridge per loop; plain callables run on the bus worker.
+        `where` filters on payload fields, e.g. {"speed": Range.lt(20), "zone": {"Z1", "Z2"}}
+        (see runtime.predicates); handlers are not called for payloads that do not match.
+        """
+        if asyncio.iscoroutinefunction(fn):
+            fn = _AsyncSubscriber(fn, self._bridge_for(loop))
+        with self._lock:
+            self._subs.add(topic, fn, where)
+
+    def subscribe_batch(self, topic: str, fn: Callable[[List[Any]], Any], *, max_batch: int = 100,
+                        max_latency_ms: float = 50.0, key: Union[str, Callable[[Any], Hashable], None] = None,
+                        loop: Optional[asyncio.AbstractEventLoop] = None):
+        """
+        Deliver matching payloads to `fn` as lists, flushed at `max_batch` events or
+        `max_latency_ms` after the first buffered one, whichever comes first.
+        `key` (a dict key name or a callable) coalesces the window to the latest payload
+        per key, e.g. key="location" for over-reporting sensors. Coroutine functions
+        receive their batches on `loop`, like subscribe().
+        """
+        if isinstance(key, str):
+            name = key
+            key = lambda p: p.get(name) if isinstance(p, dict) else p
+        bridge = self._bridge_for(loop) if asyncio.iscoroutinefunction(fn) else None
+        with self._lock:
+            if self._batch_timer is None:
+                self._batch_timer = _BatchTimer()
+            entry = _BatchSubscriber(fn, max_batch, max_latency_ms / 1000.0, key, self._batch_timer, bridge)
+            self._batches.append(entry)
+            self._subs.add(topic, entry)
+
+    def flush_batches(self):
+        """Flush every pending batch now (e.g. before shutdown or at the end of a run)."""
+        with self._lock:
+            batches = list(self._batches)
+        for b in batches:
+            b.flush()
+
+    def _bridge_for(self, loop: Optional[asyncio.AbstractEventLoop]) -> _LoopBridge:
+        if loop is None:
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                raise ValueError("async subscriber needs loop= when subscribed outside a running event loop") from None
+        with self._lock:
+            bridge = self._bridges.get(loop)
+            if bridge is None:
+                bridge = self._bridges[loop] = _LoopBridge(loop)
+            return bridge
+
+    def unsubscribe(self, topic: str, fn: Callable[[Any], Any]) -> bool:
         with self._lock:
-            self._subs.setdefault(topic, []).append(fn)
+            batch = next((b for b in self._batches if b == fn), None)
+            removed = self._subs.remove(topic, fn)
+            if removed and batch is not None:
+                self._batches.remove(batch)
+        if removed and batch is not None:
+            batch.flush()
+        return removed
+
+    def publish(self, topic: str, payload: Any) -> bool:
+        """Queue an event; returns False when the overflow policy discarded it locally."""
+        if self.event_log is not None:
+            self.event_log.append(topic, payload)
+        if self.transport is not None:
+            self.transport.send(topic, payload)
+        return self.publish_local(topic, payload)
 
-    def publish(self, topic: str, payload: Any):
+    def publish_local(self, topic: str, payload: Any) -> bool:
+        """Deliver to this process's subscribers only (no event log, no transport)."""
+        part = self._parts[self.partition_for(topic)]
+        c = part.outcomes
+        if part.spilling:
+            # keep per-partition order: nothing may overtake events already on disk
+            self._spill(part, topic, payload)
+            return True
+        policy = self.overflow
+        if policy == "sample" and part.q.qsize() >= self._sample_high:
+            if next(part.sample_seq) % self.sample_every:
+                c["sampled_out"].add()
+                return False
         try:
-            self._q.put_nowait((topic, payload))
+            part.q.put_nowait((topic, payload))
+            c["enqueued"].add()
+            return True
         except queue.Full:
-            pass  # drop for MVP
+            pass
+        if policy == "drop_oldest":
+            while True:
+                try:
+                    if part.q.get_nowait() is not _WAKE:
+                        c["dropped_oldest"].add()
+                    part.q.task_done()
+                except queue.Empty:
+                    pass
+                try:
+                    part.q.put_nowait((topic, payload))
+                    c["enqueued"].add()
+                    return True
+                except queue.Full:
+                    continue
+        if policy == "block":
+            c["blocked"].add()
+            try:
+                part.q.put((topic, payload), timeout=self.block_timeout_s)
+                c["enqueued"].add()
+                return True
+            except queue.Full:
+                c["block_timeout"].add()
+                return False
+        if policy == "spill":
+            self._spill(part, topic, payload)
+            return True
+        c["dropped_newest"].add()
+        return False
+
+    def join(self, poll_s: float = 0.01):
+        """Block until every event published so far has been delivered (spilled ones included)."""
+        for p in self._parts:
+            while True:
+                p.q.join()
+                if not p.spilling:
+                    break
+                time.sleep(poll_s)
+
+    def stats(self) -> Dict[str, Any]:
+        parts = [p.stats() for p in self._parts]
+        outcomes = {k: sum(s["outcomes"][k] for s in parts) for k in parts[0]["outcomes"]}
+        agg = {k: sum(s[k] for s in parts) for k in ("queue_depth", "queue_capacity", "published", "dropped",
+                                                   "delivered", "replayed", "subscriber_errors", "spill_backlog_bytes")}
+        with self._lock:
+            bridges = list(self._bridges.values())
+            batches = list(self._batches)
+        agg["async_batches"] = sum(b.batches for b in bridges)
+        agg["async_started"] = sum(b.started for b in bridges)
+        agg["batch_flushes"] = sum(b.flushes for b in batches)
+        agg["batch_coalesced"] = sum(b.coalesced for b in batches)
+        agg["subscriber_errors"] += sum(b.errors for b in bridges) + sum(b.errors for b in batches)
+        return {**agg, "overflow": self.overflow, "outcomes": outcomes, "partitions": parts}
 
     def shutdown(self):
         self._stop.set()
-        self._th.join(timeout=0.5)
+        for p in self._parts:
+            p.thread.join(timeout=0.5)  # each worker closes its spill file on the way out
+        if self._batch_timer is not None:
+            self._batch_timer.stop()
+        self.flush_batches()
+        if self.event_log is not None:
+            self.event_log.close()
+        if self.transport is not None:
+            self.transport.close()
+
+class PartitionedEventBus(EventBus):
+    """EventBus with several delivery workers; see EventBus for the ordering guarantee."""
+    def __init__(self, partitions:int=4, max_queue:int=8192, **kwargs):
+        super().__init__(max_queue=max_queue, partitions=partitions, **kwargs)
@@ -0,0 +1,267 @@
+
+from __future__ import annotations
+from typing import Any, Callable, Iterator, List, NamedTuple, Optional, Tuple
+import threading, os, json, pickle, struct, zlib, mmap, time, logging, fcntl
+
+logger = logging.getLogger(__name__)
+
+# record frame: [len u32][crc32 u32] + body; body = [seq u64][ts f64][codec u8][topic_len u16] topic payload
+# len counts body bytes, crc32 covers the body. Big-endian throughout.
+_FRAME = struct.Struct(">II")
+_BODY = struct.Struct(">QdBH")
+CODEC_JSON, CODEC_PICKLE = 0, 1
+SEGMENT_SUFFIX = ".seg"
+LOCK_NAME = "LOCK"
+
+class EventLogLocked(RuntimeError):
+    """Another process is writing to this event log directory."""
+
+def encode_json(payload: Any) -> Optional[bytes]:
+    """Compact JSON if it decodes back to an equal payload, else None (non-str keys, tuples, NaN, objects)."""
+    try:
+        text = json.dumps(payload, ensure_ascii=False, separators=(",", ":"))
+        if json.loads(text) == payload:
+            return text.encode("utf-8")
+    except (TypeError, ValueError):
+        pass
+    return None
+
+def encode_payload(payload: Any) -> Tuple[int, bytes]:
+    """(codec, bytes): exact JSON when possible, pickle otherwise."""
+    data = encode_json(payload)
+    if data is not None:
+        return CODEC_JSON, data
+    return CODEC_PICKLE, pickle.dumps(payload, protocol=pickle.HIGHEST_PROTOCOL)
+
+def decode_payload(codec: int, data: bytes) -> Any:
+    if codec == CODEC_JSON:
+        return json.loads(data)
+    if codec == CODEC_PICKLE:
+        return pickle.loads(data)
+    raise ValueError(f"unknown payload codec {codec}")
+
+def encode_record(seq: int, ts: float, topic: str, codec: int, payload: bytes) -> bytes:
+    t = topic.encode("utf-8")
+    body = _BODY.pack(seq, ts, codec, len(t)) + t + payload
+    return _FRAME.pack(len(body), zlib.crc32(body)) + body
+
+class LogRecord(NamedTuple):
+    seq: int
+    ts: float
+    topic: str
+    payload: Any
+
+def _segments(dirpath: str) -> List[str]:
+    if not os.path.isdir(dirpath):
+        return []
+    names = sorted(n for n in os.listdir(dirpath) if n.endswith(SEGMENT_SUFFIX))
+    return [os.path.join(dirpath, n) for n in names]
+
+def _scan(buf, start: int = 0) -> Iterator[Tuple[int, int, float, str, int, bytes]]:
+    """(end offset, seq, ts, topic, codec, payload) for each intact record; stops at the first torn/corrupt one."""
+    off, n = start, len(buf)
+    while off + _FRAME.size <= n:
+        length, crc = _FRAME.unpack_from(buf, off)
+        body_at = off + _FRAME.size
+        end = body_at + length
+        if length < _BODY.size or end > n:
+            return
+        body = buf[body_at:end]  # one copy out of the mapping per record
+        if zlib.crc32(body) != crc:
+            return
+        seq, ts, codec, tlen = _BODY.unpack_from(body)
+        t_at = _BODY.size
+        yield end, seq, ts, body[t_at:t_at + tlen].decode("utf-8"), codec, body[t_at + tlen:]
+        off = end
+
+class EventLogWriter:
+    """
+    Append-only event log in numbered segment files (<first seq>.seg). append() only
+    queues the record; a writer thread commits everything queued so far with one
+    write() (and one fsync when `fsync=True`) every `commit_interval_ms` or as soon as
+    `group_bytes` are pending, so publishers never wait on the disk. flush() blocks
+    until everything appended so far is committed. Reopening a directory truncates a
+    torn tail left by a crash and continues the sequence. A directory has one writer:
+    it is flock()ed, and a second process opening it gets EventLogLocked.
+    """
+    def __init__(self, dirpath: str, segment_bytes: int = 64 << 20, commit_interval_ms: float = 5.0,
+                 group_bytes: int = 1 << 20, fsync: bool = False):
+        self.dirpath = dirpath
+        self.segment_bytes = segment_bytes
+        self.commit_interval_s = commit_interval_ms / 1000.0
+        self.group_bytes = group_bytes
+        self.fsync = fsync
+        os.makedirs(dirpath, exist_ok=True)
+        self._lock_f = open(os.path.join(dirpath, LOCK_NAME), "a+b")
+        try:
+            fcntl.flock(self._lock_f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            self._lock_f.close()
+            raise EventLogLocked(f"event log {dirpath} is in use by another process")
+        self._cv = threading.Condition()
+        self._pending: List[Tuple[int, float, str, int, bytes]] = []
+        self._pending_bytes = 0
+        self._next_seq, self._f = self._recover()
+        self._committed = self._next_seq - 1
+        self._closed = False
+        self._flush_requested = False
+        self.commits = 0
+        self.records = 0
+        self._th = threading.Thread(target=self._loop, daemon=True, name="eventlog-writer")
+        self._th.start()
+
+    def _recover(self):
+        segs = _segments(self.dirpath)
+        if not segs:
+            return 0, None
+        last = segs[-1]
+        next_seq = int(os.path.basename(last)[:-len(SEGMENT_SUFFIX)])
+        good = 0
+        size = os.path.getsize(last)
+        if size:
+            with open(last, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                for end, seq, *_ in _scan(mm):
+                    good, next_seq = end, seq + 1
+        f = open(last, "r+b")
+        if good < size:
+            logger.warning("event log %s: dropping %d torn bytes at the tail", last, size - good)
+            f.truncate(good)
+        f.seek(good)
+        return next_seq, f
+
+    @property
+    def next_seq(self) -> int:
+        return self._next_seq
+
+    def append(self, topic: str, payload: Any, ts: Optional[float] = None) -> int:
+        """Queue one event; returns its sequence number."""
+        codec, data = encode_payload(payload)
+        ts = time.time() if ts is None else ts
+        with self._cv:
+            if self._closed:
+                raise ValueError("event log is closed")
+            seq = self._next_seq
+            self._next_seq += 1
+            self._pending.append((seq, ts, topic, codec, data))
+            self._pending_bytes += len(data)
+            if self._pending_bytes >= self.group_bytes:
+                self._cv.notify_all()
+        return seq
+
+    def _open_segment(self, first_seq: int):
+        if self._f is not None:
+            self._f.close()
+        self._f = open(os.path.join(self.dirpath, f"{first_seq:020d}{SEGMENT_SUFFIX}"), "w+b")
+
+    def _commit(self, batch: List[Tuple[int, float, str, int, bytes]]):
+        chunks: List[bytes] = []
+        size = self._f.tell() if self._f is not None else 0
+        for seq, ts, topic, codec, data in batch:
+            frame = encode_record(seq, ts, topic, codec, data)
+            if self._f is None or (size and size + len(frame) > self.segment_bytes):
+                if chunks:
+                    self._f.write(b"".join(chunks))
+                    chunks = []
+                self._open_segment(seq)
+                size = 0
+            chunks.append(frame)
+            size += len(frame)
+        if chunks:
+            self._f.write(b"".join(chunks))
+        self._f.flush()
+        if self.fsync:
+            os.fsync(self._f.fileno())
+        self.commits += 1
+        self.records += len(batch)
+
+    def _loop(self):
+        while True:
+            with self._cv:
+                if self._pending_bytes < self.group_bytes and not (self._closed or self._flush_requested):
+                    self._cv.wait(timeout=self.commit_interval_s)  # let the group fill up
+                self._flush_requested = False
+                batch, self._pending, self._pending_bytes = self._pending, [], 0
+                closed = self._closed
+            if batch:
+                try:
+                    self._commit(batch)
+                except Exception:
+                    logger.exception("event log commit of %d records failed", len(batch))
+            with self._cv:
+                if batch:
+                    self._committed = batch[-1][0]
+                self._cv.notify_all()
+                if closed and not self._pending:
+                    return
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every record appended so far is on disk (or in the OS cache without fsync)."""
+        with self._cv:
+            target = self._next_seq - 1
+            self._flush_requested = True
+            self._cv.notify_all()
+            return self._cv.wait_for(lambda: self._committed >= target, timeout=timeout)
+
+    def close(self):
+        with self._cv:
+            if self._closed:
+                return
+            self._closed = True
+            self._cv.notify_all()
+        self._th.join()
+        if self._f is not None:
+            self._f.close()
+        self._lock_f.close()  # releases the flock
+
+def open_worker_log(root: str, max_workers: int = 64, **kwargs) -> EventLogWriter:
+    """
+    EventLogWriter on the first free root/worker-<n> directory, for several processes
+    sharing one EVENTLOG_DIR: each gets its own log, and a restarted worker picks up a
+    released one (recovering its tail) instead of creating a new directory.
+    """
+    for n in range(max_workers):
+        try:
+            return EventLogWriter(os.path.join(root, f"worker-{n}"), **kwargs)
+        except EventLogLocked:
+            continue
+    raise EventLogLocked(f"all {max_workers} worker logs under {root} are in use")
+
+class EventLogReader:
+    """Reads segments written by EventLogWriter through mmap; stops cleanly at a torn tail."""
+    def __init__(self, dirpath: str):
+        self.dirpath = dirpath
+
+    def __iter__(self) -> Iterator[LogRecord]:
+        return self.read()
+
+    def read(self, from_seq: int = 0) -> Iterator[LogRecord]:
+        segs = _segments(self.dirpath)
+        firsts = [int(os.path.basename(s)[:-len(SEGMENT_SUFFIX)]) for s in segs]
+        for i, path in enumerate(segs):
+            if i + 1 < len(firsts) and firsts[i + 1] <= from_seq:
+                continue  # whole segment is before from_seq
+            if not os.path.getsize(path):
+                continue
+            with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                for _, seq, ts, topic, codec, data in _scan(mm):
+                    if seq >= from_seq:
+                        yield LogRecord(seq, ts, topic, decode_payload(codec, data))
+
+    def replay(self, publish: Callable[[str, Any], Any], speed: Optional[float] = None, from_seq: int = 0) -> int:
+        """
+        Feed records to `publish(topic, payload)` (e.g. dsl.emit). speed=None replays as
+        fast as possible; speed=1.0 reproduces the recorded inter-event timing, 10.0 is 10x.
+        Returns the number of records replayed.
+        """
+        n = 0
+        t0 = first_ts = None
+        for rec in self.read(from_seq):
+            if speed:
+                if t0 is None:
+                    t0, first_ts = time.perf_counter(), rec.ts
+                delay = (rec.ts - first_ts) / speed - (time.perf_counter() - t0)
+                if delay > 0:
+                    time.sleep(delay)
+            publish(rec.topic, rec.payload)
+            n += 1
+        return n
@@ -0,0 +1,200 @@
+
+from __future__ import annotations
+from bisect import bisect_right
+from typing import Any, Callable, Dict, Hashable, List, Tuple
+import math
+
+_MISSING = object()
+
+def _kind(v: Any) -> Any:
+    """Ordering class of a value: all numbers compare with each other, anything else only within its type."""
+    return float if isinstance(v, (int, float)) else type(v)
+
+class Range:
+    """
+    Numeric (or otherwise ordered) interval on one payload field, default [lo, hi).
+    Range.lt(20) is "speed < 20", Range.between(5, 10) is 5 <= x <= 10.
+    Both bounds must be orderable and of the same kind (numbers, or one other type);
+    values of another kind are never in the range.
+    """
+    __slots__ = ("lo", "hi", "lo_inclusive", "hi_inclusive")
+
+    def __init__(self, lo: Any = None, hi: Any = None, *, lo_inclusive: bool = True, hi_inclusive: bool = False):
+        bounds = [b for b in (lo, hi) if b is not None]
+        if len({_kind(b) for b in bounds}) > 1:
+            raise ValueError(f"Range bounds must be of the same kind, got {lo!r} and {hi!r}")
+        for b in bounds:
+            try:
+                b <= b
+            except TypeError:
+                raise ValueError(f"Range bound {b!r} is not orderable") from None
+        self.lo, self.hi = lo, hi
+        self.lo_inclusive, self.hi_inclusive = lo_inclusive, hi_inclusive
+
+    @classmethod
+    def lt(cls, v): return cls(hi=v)
+    @classmethod
+    def le(cls, v): return cls(hi=v, hi_inclusive=True)
+    @classmethod
+    def gt(cls, v): return cls(lo=v, lo_inclusive=False)
+    @classmethod
+    def ge(cls, v): return cls(lo=v)
+    @classmethod
+    def between(cls, lo, hi): return cls(lo, hi, hi_inclusive=True)
+
+    def _above_lo(self, v) -> bool:
+        return self.lo is None or (v >= self.lo if self.lo_inclusive else v > self.lo)
+
+    def _below_hi(self, v) -> bool:
+        return self.hi is None or (v <= self.hi if self.hi_inclusive else v < self.hi)
+
+    def __contains__(self, v) -> bool:
+        try:
+            return self._above_lo(v) and self._below_hi(v)
+        except TypeError:
+            return False
+
+    def __repr__(self):
+        lb = "[" if self.lo_inclusive else "("
+        rb = "]" if self.hi_inclusive else ")"
+        return f"Range{lb}{self.lo}, {self.hi}{rb}"
+
+def field_value(payload: Any, path: str) -> Any:
+    """payload[path] for dict payloads; dotted paths walk nested dicts. _MISSING when absent."""
+    cur = payload
+    for key in path.split("."):
+        if not isinstance(cur, dict):
+            return _MISSING
+        cur = cur.get(key, _MISSING)
+        if cur is _MISSING:
+            return _MISSING
+    return cur
+
+class _RangeIndex:
+    """
+    Ranges on one field sorted by lower bound, partitioned by the kind of their bounds
+    (see _kind) so numeric and e.g. string ranges never get compared with each other;
+    lookup bisects away every range of the value's kind starting above the value.
+    """
+    def __init__(self):
+        # kind -> ([(lo or -inf, sub id, range)], [lo]) sorted by lower bound
+        self._parts: Dict[Any, Tuple[List[Tuple[Any, int, Range]], List[Any]]] = {}
+        self._unbounded: List[Tuple[int, Range]] = []  # non-numeric ranges without a lower bound
+
+    def add(self, sid: int, r: Range):
+        if r.lo is None and not isinstance(r.hi, (int, float)):
+            self._unbounded.append((sid, r))
+            return
+        lo = -math.inf if r.lo is None else r.lo
+        entries = self._parts.get(_kind(lo), ([], []))[0] + [(lo, sid, r)]
+        entries.sort(key=lambda e: (e[0], e[1]))
+        self._parts[_kind(lo)] = (entries, [e[0] for e in entries])
+
+    def remove(self, sid: int):
+        for kind, (entries, _) in list(self._parts.items()):
+            entries = [e for e in entries if e[1] != sid]
+            if entries:
+                self._parts[kind] = (entries, [e[0] for e in entries])
+            else:
+                del self._parts[kind]
+        self._unbounded = [e for e in self._unbounded if e[0] != sid]
+
+    def match(self, v: Any, out: Dict[int, int]):
+        part = self._parts.get(_kind(v))
+        if part is not None:
+            entries, los = part
+            try:
+                k = bisect_right(los, v)
+            except TypeError:  # same type but unorderable (e.g. tuples of mixed items): no match
+                k = 0
+            for _, sid, r in entries[:k]:
+                if v in r:
+                    out[sid] = out.get(sid, 0) + 1
+        for sid, r in self._unbounded:
+            if v in r:
+                out[sid] = out.get(sid, 0) + 1
+
+    def __bool__(self):
+        return bool(self._parts or self._unbounded)
+
+class PredicateIndex:
+    """
+    Content filters of all subscriptions on one topic pattern, indexed by field:
+    equality and set-membership conditions share a value -> subscribers hash map,
+    ranges live in a per-field _RangeIndex. select(payload) looks up only the fields
+    that some subscription filters on and counts satisfied conditions per subscription
+    (conditions on different fields are ANDed), so non-matching handlers are never touched.
+
+    A `where` spec maps a field (dotted paths allowed) to a value (equality), a
+    set/frozenset (membership) or a Range.
+    """
+    def __init__(self):
+        self._eq: Dict[str, Dict[Hashable, List[int]]] = {}
+        self._ranges: Dict[str, _RangeIndex] = {}
+        self._subs: Dict[int, Tuple[Callable[[Any], Any], int, Dict[str, Any]]] = {}  # id -> (fn, n conditions, spec)
+        self._next = 0
+
+    def __len__(self):
+        return len(self._subs)
+
+    def add(self, fn: Callable[[Any], Any], where: Dict[str, Any]):
+        if not where:
+            raise ValueError("where= needs at least one field condition")
+        sid = self._next
+        self._next += 1
+        for field, cond in where.items():
+            if isinstance(cond, Range):
+                self._ranges.setdefault(field, _RangeIndex()).add(sid, cond)
+            elif isinstance(cond, (set, frozenset)):
+                values = self._eq.setdefault(field, {})
+                for v in cond:
+                    values.setdefault(v, []).append(sid)
+            else:
+                self._eq.setdefault(field, {}).setdefault(cond, []).append(sid)
+        self._subs[sid] = (fn, len(where), dict(where))
+
+    def remove(self, fn: Callable[[Any], Any]) -> bool:
+        sid = next((s for s, (f, _, _) in self._subs.items() if f == fn), None)
+        if sid is None:
+            return False
+        _, _, where = self._subs.pop(sid)
+        for field in where:
+            values = self._eq.get(field)
+            if values is not None:
+                for v in list(values):
+                    values[v] = [s for s in values[v] if s != sid]
+                    if not values[v]:
+                        del values[v]
+                if not values:
+                    del self._eq[field]
+            ranges = self._ranges.get(field)
+            if ranges is not None:
+                ranges.remove(sid)
+                if not ranges:
+                    del self._ranges[field]
+        return True
+
+    def select(self, payload: Any) -> List[Callable[[Any], Any]]:
+        hits: Dict[int, int] = {}
+        for field, values in self._eq.items():
+            v = field_value(payload, field)
+            if v is _MISSING:
+                continue
+            try:
+                sids = values.get(v)
+            except TypeError:  # unhashable field value
+                continue
+            if sids:
+                for sid in sids:
+                    hits[sid] = hits.get(sid, 0) + 1
+        for field, ranges in self._ranges.items():
+            v = field_value(payload, field)
+            if v is not _MISSING:
+                ranges.match(v, hits)
+        if not hits:
+            return []
+        subs = self._subs
+        return [subs[sid][0] for sid in sorted(hits) if hits[sid] == subs[sid][1]]
+
+    def subscribers(self) -> List[Callable[[Any], Any]]:
+        return [fn for fn, _, _ in self._subs.values()]
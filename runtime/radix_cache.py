@@ -22,6 +22,9 @@ class RadixTrieCache:
         self._lru = OrderedDict()   # key -> True
         self._lock = threading.RLock()
 
+    def __len__(self) -> int:
+        return len(self._lru)
+
     def _touch(self, key:str):
         if key in self._lru:
             self._lru.move_to_end(key)
@@ -2,7 +2,37 @@
 from __future__ import annotations
 from dataclasses import dataclass, field
 from typing import Any, Dict, Optional, Callable, Tuple, List
-import threading, time, queue
+import threading, time, queue, logging
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class TaskTrace:
+    """
+    perf_counter() timestamps of one task's life: submit -> dequeue -> cache lookup ->
+    LLM attempt(s) / validation / backoff -> complete. Spans are (start, end) pairs.
+    """
+    t_submit: float = 0.0
+    t_dequeue: float = 0.0
+    cache_span: Optional[Tuple[float, float]] = None
+    llm_spans: List[Tuple[float, float]] = field(default_factory=list)
+    validate_spans: List[Tuple[float, float]] = field(default_factory=list)
+    backoff_spans: List[Tuple[float, float]] = field(default_factory=list)
+    t_complete: float = 0.0
+
+    def phases_ms(self) -> Dict[str, float]:
+        """Per-phase durations in ms; 'total' runs from submit to completion."""
+        def _sum(spans):
+            return sum(b - a for a, b in spans) * 1000.0
+        c = self.cache_span
+        return {
+            "queue_wait": max(0.0, self.t_dequeue - self.t_submit) * 1000.0 if self.t_submit else 0.0,
+            "cache_lookup": ((c[1] - c[0]) * 1000.0) if c else 0.0,
+            "llm": _sum(self.llm_spans),
+            "validation": _sum(self.validate_spans),
+            "backoff": _sum(self.backoff_spans),
+            "total": max(0.0, self.t_complete - (self.t_submit or self.t_dequeue)) * 1000.0,
+        }
 
 @dataclass
 class Task:
@@ -18,6 +48,7 @@ class Task:
 
     _result: Any = field(default=None, init=False)
     _event: threading.Event = field(default_factory=threading.Event, init=False)
+    trace: TaskTrace = field(default_factory=TaskTrace, init=False, repr=False)
 
     def set_result(self, val:Any):
         self._result = val
@@ -27,6 +58,22 @@ class Task:
         self._event.wait(timeout)
         return self._result
 
+class SchedulerObserver:
+    """
+    Instrumentation hooks for CacheAwareScheduler; override any subset.
+    Called synchronously on the submitting thread (on_submit) or a worker thread (the rest),
+    so keep them cheap. Exceptions raised by observers are logged and counted in
+CacheAwareScheduler.observer_errors; they never reach the task.
+    """
+    def on_submit(self, task: Task, prefix_len: int): pass
+    def on_dequeue(self, task: Task): pass
+    def on_cache_result(self, task: Task, prefix_len: int, full_hit: bool): pass
+    def on_llm_start(self, task: Task, attempt: int, prompt: str): pass
+    def on_llm_end(self, task: Task, attempt: int, output: Any, error: Optional[BaseException]): pass
+    def on_complete(self, task: Task, result: Any, cache_hit: bool): pass
+    # worker is done with a dequeued task, whether it completed or raised; pairs with on_dequeue
+    def on_release(self, task: Task): pass
+
 class CacheAwareScheduler:
     """Priority = (longer prefix first, then higher task priority, then FIFO)."""
     def __init__(self, workers:int=8):
@@ -38,6 +85,9 @@ class CacheAwareScheduler:
         self._cache = None
         self._metrics = None
         self.use_cache = True
+        # copy-on-write so workers iterate without a lock; empty tuple = no hook overhead
+        self._observers: Tuple[SchedulerObserver, ...] = ()
+        self.observer_errors = 0
         for _ in range(max(1, workers)):
             th = threading.Thread(target=self._worker, daemon=True)
             th.start()
@@ -49,6 +99,27 @@ class CacheAwareScheduler:
         self._metrics = metrics
         self.use_cache = bool(use_cache)
 
+    @property
+    def num_workers(self) -> int:
+        return len(self._threads)
+
+    def queue_depth(self) -> int:
+        return self._q.qsize()
+
+    def add_observer(self, observer: SchedulerObserver):
+        self._observers = self._observers + (observer,)
+
+    def remove_observer(self, observer: SchedulerObserver):
+        self._observers = tuple(o for o in self._observers if o is not observer)
+
+    def _notify(self, hook: str, *args):
+        for o in self._observers:
+            try:
+                getattr(o, hook)(*args)
+            except Exception:
+                self.observer_errors += 1
+                logger.exception("Scheduler observer %r failed in %s", o, hook)
+
     def add(self, t: Task):
         prefix_len = 0
         if self.use_cache and (self._cache is not None):
@@ -58,6 +129,9 @@ class CacheAwareScheduler:
                 prefix_len = 0
         self._seq += 1
         key = (-int(prefix_len), -int(t.priority), self._seq)
+        t.trace.t_submit = time.perf_counter()
+        if self._observers:
+            self._notify("on_submit", t, int(prefix_len))
         self._q.put((key, t))
         if self._metrics: self._metrics.on_submit()
 
@@ -71,7 +145,14 @@ class CacheAwareScheduler:
                 if t.name == "__stop__":
                     # 收到停机标记，退出该 worker
                     return
-                self._execute_task(t)
+                t.trace.t_dequeue = time.perf_counter()
+                if self._observers:
+                    self._notify("on_dequeue", t)
+                try:
+                    self._execute_task(t)
+                finally:
+                    if self._observers:
+                        self._notify("on_release", t)
             finally:
                 self._q.task_done()
 
@@ -79,50 +160,94 @@ class CacheAwareScheduler:
     def _execute_task(self, t: Task):
         cache_full_hit = False
         start_ts = time.time()
+        tr = t.trace
+        if not tr.t_dequeue:  # called directly, not through a worker
+            tr.t_dequeue = time.perf_counter()
+        agent_role = t.agent.role if hasattr(t.agent, 'role') else t.agent
         if self.use_cache and (self._cache is not None):
+            c0 = time.perf_counter()
             plen, hit_val = self._cache.get_with_lmp(t.prompt)
-            if hit_val is not None and plen == len(t.prompt):
-                cache_full_hit = True
+            tr.cache_span = (c0, time.perf_counter())
+            cache_full_hit = hit_val is not None and plen == len(t.prompt)
+            if self._observers:
+                self._notify("on_cache_result", t, plen, cache_full_hit)
+            if cache_full_hit:
+                tr.t_complete = time.perf_counter()
                 t.set_result(hit_val)
                 if self._metrics:
                     self._metrics.on_complete((time.time()-start_ts)*1000.0, True)
+                    self._metrics.on_trace(agent_role, t.name, tr)
+                if self._observers:
+                    self._notify("on_complete", t, hit_val, True)
                 return
         out, ok = None, False
         attempts = 0
-        agent_role = t.agent.role if hasattr(t.agent, 'role') else t.agent
         while attempts <= t.max_retries and not ok:
+            if self._observers:
+                self._notify("on_llm_start", t, attempts, t.prompt)
+            l0 = time.perf_counter()
             try:
                 out = self._llm(t.prompt, agent_role) if self._llm is not None else f"[LLM:{agent_role}] {t.prompt}"
-                if t.constraint is not None:
+                v0 = time.perf_counter()
+                tr.llm_spans.append((l0, v0))
+                if self._observers:
+                    self._notify("on_llm_end", t, attempts, out, None)
+                if t.constraint is not None and not getattr(t.constraint, 'is_trivial', False):
                     if hasattr(t.constraint, 'validate'):
                         ok = bool(t.constraint.validate(out))
                     elif hasattr(t.constraint, 'valid'):
                         ok = bool(t.constraint.valid(out))
                     else:
                         ok = True
+                    if not ok and getattr(t.constraint, 'repairable', False):
+                        # cheap local fix (fences, prose, missing braces) before paying for a retry
+                        fixed = t.constraint.repair(out)
+                        if self._metrics:
+                            self._metrics.on_repair(fixed is not None)
+                        if fixed is not None:
+                            out, ok = fixed, True
+                    tr.validate_spans.append((v0, time.perf_counter()))
                 else:
                     ok = True
             except Exception as e:
+                if len(tr.llm_spans) < attempts + 1:
+                    tr.llm_spans.append((l0, time.perf_counter()))
+                    if self._observers:
+                        self._notify("on_llm_end", t, attempts, None, e)
                 out = f"[error:{t.name}] {e}"
                 ok = False
             if not ok:
                 attempts += 1
                 if attempts <= t.max_retries:
+                    b0 = time.perf_counter()
                     time.sleep((t.backoff_ms/1000.0) * (2**(attempts-1)))
+                    tr.backoff_spans.append((b0, time.perf_counter()))
         if not ok and t.fallback_prompt:
+            if self._observers:
+                self._notify("on_llm_start", t, attempts, t.fallback_prompt)
+            l0 = time.perf_counter()
+            err = None
             try:
                 out = self._llm(t.fallback_prompt, agent_role) if self._llm else t.fallback_prompt
                 ok = True
             except Exception as e:
+                err = e
                 out = f"[error:{t.name}] {e}"
+            tr.llm_spans.append((l0, time.perf_counter()))
+            if self._observers:
+                self._notify("on_llm_end", t, attempts, None if err else out, err)
         if ok and self.use_cache and (self._cache is not None):
             try:
                 self._cache.put(t.prompt, out)
             except Exception:
                 pass
+        tr.t_complete = time.perf_counter()
         t.set_result(out)
         if self._metrics:
             self._metrics.on_complete((time.time()-start_ts)*1000.0, cache_full_hit)
+            self._metrics.on_trace(agent_role, t.name, tr)
+        if self._observers:
+            self._notify("on_complete", t, out, False)
 
     def shutdown(self):
         # 推送与 worker 数量相同的停机任务，使用唯一自增序号避免 PriorityQueue 比较 Task
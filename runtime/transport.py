@@ -0,0 +1,324 @@
+
+from __future__ import annotations
+from typing import Any, Callable, Dict, List, Optional
+import argparse, asyncio, logging, os, queue, socket, stat, struct, subprocess, sys, threading, time
+
+from runtime.eventlog import CODEC_JSON, decode_payload, encode_json
+
+logger = logging.getLogger(__name__)
+
+# wire frame: [len u32][codec u8][topic_len u16] topic payload   (len counts everything after itself)
+# Only CODEC_JSON travels on the wire: a pickle from a socket peer would be code execution.
+_LEN = struct.Struct(">I")
+_HDR = struct.Struct(">BH")
+
+def _runtime_dir() -> str:
+    """Per-user directory for the socket: $XDG_RUNTIME_DIR, else a 0700 dir under $TMPDIR."""
+    xdg = os.getenv("XDG_RUNTIME_DIR")
+    if xdg:
+        return xdg
+    return os.path.join(os.getenv("TMPDIR", "/tmp"), f"dsl-eventbus-{os.getuid()}")
+
+DEFAULT_SOCKET = os.path.join(_runtime_dir(), "dsl-eventbus.sock")
+
+def _private_dir(path: str):
+    """Create the socket's directory (0700) if missing and refuse one another user owns or can write."""
+    d = os.path.dirname(os.path.abspath(path))
+    os.makedirs(d, mode=0o700, exist_ok=True)
+    st = os.lstat(d)
+    if not stat.S_ISDIR(st.st_mode) or st.st_uid != os.getuid() or st.st_mode & 0o022:
+        raise PermissionError(f"{d} must be a directory owned by uid {os.getuid()} and not group/world-writable")
+
+def _check_owner(path: str):
+    """A socket someone else created may be a hostile broker: only talk to our own."""
+    st = os.lstat(path)
+    if not stat.S_ISSOCK(st.st_mode) or st.st_uid != os.getuid():
+        raise PermissionError(f"{path} is not a socket owned by uid {os.getuid()}")
+
+def encode_frame(topic: str, payload: Any) -> bytes:
+    """Raises ValueError for payloads that JSON cannot carry exactly."""
+    data = encode_json(payload)
+    if data is None:
+        raise ValueError(f"payload on {topic!r} is not exactly JSON-serializable")
+    t = topic.encode("utf-8")
+    body = _HDR.pack(CODEC_JSON, len(t)) + t + data
+    return _LEN.pack(len(body)) + body
+
+def decode_frame(body: bytes):
+    codec, tlen = _HDR.unpack_from(body)
+    if codec != CODEC_JSON:
+        raise ValueError(f"refusing non-JSON frame (codec {codec})")
+    t_at = _HDR.size
+    return body[t_at:t_at + tlen].decode("utf-8"), decode_payload(codec, body[t_at + tlen:])
+
+def _peer_uid(sock: socket.socket) -> Optional[int]:
+    if not hasattr(socket, "SO_PEERCRED"):
+        return None
+    creds = sock.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i"))
+    return struct.unpack("3i", creds)[1]
+
+class EventBroker:
+    """
+    Fan-out hub for UnixSocketTransport clients: every frame a client sends is forwarded,
+    unparsed, to all other connected clients. The socket is 0600 in a private directory,
+    and peers running as another user are turned away. Clients whose socket buffer stays above
+    `max_buffer` bytes miss frames (counted) rather than stalling the others.
+    """
+    def __init__(self, path: str = DEFAULT_SOCKET, max_buffer: int = 8 << 20):
+        self.path = path
+        self.max_buffer = max_buffer
+        self._clients: List[asyncio.StreamWriter] = []
+        self.forwarded = 0
+        self.dropped = 0
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        uid = _peer_uid(writer.get_extra_info("socket"))
+        if uid is not None and uid != os.getuid():
+            logger.warning("event broker: rejecting peer with uid %d", uid)
+            writer.close()
+            return
+        self._clients.append(writer)
+        try:
+            while True:
+                head = await reader.readexactly(_LEN.size)
+                frame = head + await reader.readexactly(_LEN.unpack(head)[0])
+                for w in self._clients:
+                    if w is writer:
+                        continue
+                    if w.transport.get_write_buffer_size() > self.max_buffer:
+                        self.dropped += 1
+                        continue
+                    w.write(frame)
+                    self.forwarded += 1
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self._clients.remove(writer)
+            writer.close()
+
+    async def serve_forever(self):
+        _private_dir(self.path)
+        if os.path.exists(self.path):
+            if _is_listening(self.path):
+                raise RuntimeError(f"a broker is already listening on {self.path}")
+            os.unlink(self.path)  # stale socket from a dead broker
+        server = await asyncio.start_unix_server(self._handle, path=self.path)
+        os.chmod(self.path, 0o600)
+        logger.info("event broker listening on %s", self.path)
+        async with server:
+            await server.serve_forever()
+
+def _is_listening(path: str) -> bool:
+    s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        s.connect(path)
+        return True
+    except OSError:
+        return False
+    finally:
+        s.close()
+
+def ensure_broker(path: str = DEFAULT_SOCKET, timeout_s: float = 5.0) -> bool:
+    """
+    Start a broker process on `path` unless one already answers; returns True once it does.
+    Raises PermissionError when the directory or an existing socket belongs to another user.
+    """
+    _private_dir(path)
+    if os.path.exists(path):
+        _check_owner(path)
+    if _is_listening(path):
+        return True
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [root, os.getenv("PYTHONPATH")])))
+    subprocess.Popen([sys.executable, "-m", "runtime.transport", "--path", path], cwd=root, env=env,
+                     start_new_session=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + timeout_s
+    while time.monotonic() < deadline:
+        if _is_listening(path):
+            _check_owner(path)
+            return True
+        time.sleep(0.05)
+    return False
+
+class UnixSocketTransport:
+    """
+    Connects one process's EventBus to an EventBroker. Local publishes are queued and
+    written by a sender thread that coalesces everything pending into one sendall();
+    frames from other processes are handed to bus.publish_local(), so they reach local
+    subscribers without being forwarded again. Topics registered with handle() bypass
+    the bus (used for process-wide side channels such as WebSocket broadcasts).
+    Reconnects with backoff, and only to a socket owned by the current user. Payloads
+    travel as JSON: ones JSON cannot carry exactly are not sent (counted as
+    `unencodable`), and non-JSON frames from the broker are refused. Frames that cannot
+    be written, or that overflow `max_pending` while the broker is unreachable, are
+    dropped and counted.
+    """
+    def __init__(self, path: str = DEFAULT_SOCKET, max_pending: int = 65536):
+        self.path = path
+        self._out: "queue.Queue[bytes]" = queue.Queue(maxsize=max_pending)
+        self._handlers: Dict[str, Callable[[Any], None]] = {}
+        self._bus = None
+        self._sock: Optional[socket.socket] = None
+        self._stop = threading.Event()
+        self.sent = 0
+        self.received = 0
+        self.dropped = 0
+        self.unencodable = 0
+        self.rejected = 0
+        self._th = threading.Thread(target=self._send_loop, daemon=True, name="eventbus-transport-send")
+
+    def attach(self, bus) -> "UnixSocketTransport":
+        self._bus = bus
+        bus.transport = self
+        if not self._th.is_alive():
+            self._th.start()
+        return self
+
+    def handle(self, topic: str, fn: Callable[[Any], None]):
+        """Route remote frames on `topic` to `fn` (called on the receiver thread) instead of the bus."""
+        self._handlers[topic] = fn
+
+    @property
+    def connected(self) -> bool:
+        return self._sock is not None
+
+    def send(self, topic: str, payload: Any):
+        try:
+            frame = encode_frame(topic, payload)
+        except ValueError:
+            if not self.unencodable:
+                logger.warning("event on %r not forwarded to other processes: payload is not plain JSON", topic)
+            self.unencodable += 1
+            return
+        try:
+            self._out.put_nowait(frame)
+        except queue.Full:
+            self.dropped += 1
+
+    def _connect(self) -> socket.socket:
+        backoff = 0.05
+        while not self._stop.is_set():
+            s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                _check_owner(self.path)
+                s.connect(self.path)
+            except PermissionError as e:
+                s.close()
+                logger.warning("event transport: %s; not connecting", e)
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 2.0)
+                continue
+            except OSError:
+                s.close()
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 2.0)
+                continue
+            threading.Thread(target=self._recv_loop, args=(s,), daemon=True, name="eventbus-transport-recv").start()
+            self._sock = s
+            return s
+        raise ConnectionError("transport stopped")
+
+    def _send_loop(self):
+        try:
+            sock = self._connect()
+        except ConnectionError:
+            return
+        while not self._stop.is_set():
+            if self._sock is not sock:  # receiver saw the broker go away
+                sock.close()
+                try:
+                    sock = self._connect()
+                except ConnectionError:
+                    return
+            try:
+                first = self._out.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            frames = [first]
+            while len(frames) < 1024:
+                try:
+                    frames.append(self._out.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                sock.sendall(b"".join(frames))
+                self.sent += len(frames)
+            except OSError:
+                self.dropped += len(frames)
+                self._sock = None
+                sock.close()
+                try:
+                    sock = self._connect()
+                except ConnectionError:
+                    return
+
+    def _recv_loop(self, sock: socket.socket):
+        buf = bytearray()
+        while not self._stop.is_set():
+            try:
+                chunk = sock.recv(1 << 16)
+            except OSError:
+                break
+            if not chunk:
+                break
+            buf += chunk
+            off = 0
+            while len(buf) - off >= _LEN.size:
+                (n,) = _LEN.unpack_from(buf, off)
+                if len(buf) - off - _LEN.size < n:
+                    break
+                body = bytes(buf[off + _LEN.size: off + _LEN.size + n])
+                off += _LEN.size + n
+                self._dispatch(body)
+            del buf[:off]
+        if self._sock is sock:
+            self._sock = None
+            try:
+                sock.shutdown(socket.SHUT_RDWR)  # wake the sender so it reconnects
+            except OSError:
+                pass
+
+    def _dispatch(self, body: bytes):
+        try:
+            topic, payload = decode_frame(body)
+        except Exception as e:
+            self.rejected += 1
+            logger.warning("dropping frame from broker: %s", e)
+            return
+        self.received += 1
+        fn = self._handlers.get(topic)
+        try:
+            if fn is not None:
+                fn(payload)
+            elif self._bus is not None:
+                self._bus.publish_local(topic, payload)
+        except Exception:
+            logger.exception("remote event on %r failed", topic)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"connected": self.connected, "sent": self.sent, "received": self.received,
+                "dropped": self.dropped, "unencodable": self.unencodable, "rejected": self.rejected,
+                "pending": self._out.qsize()}
+
+    def close(self):
+        self._stop.set()
+        s, self._sock = self._sock, None
+        if s is not None:
+            try:
+                s.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            s.close()
+
+def main():
+    ap = argparse.ArgumentParser("eventbus-broker")
+    ap.add_argument("--path", default=DEFAULT_SOCKET)
+    args = ap.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    try:
+        asyncio.run(EventBroker(args.path).serve_forever())
+    except RuntimeError as e:
+        logger.info("%s", e)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark: WebSocket broadcast CPU cost with N simulated clients.
+对比旧实现（每个客户端 send_json，即每客户端一次 json.dumps，并打印整条消息）
+与当前 ConnectionManager（每条广播只编码一次，按客户端队列发送同一帧）。
+--coalesce-ms > 0 时按客户端合并为 batch 帧，统计实际写出的帧数。
+用法:
+    PYTHONPATH=. python scripts/bench_broadcast.py --clients 1000 --broadcasts 200 [--coalesce-ms 20]
+"""
+
+import argparse, asyncio, contextlib, io, json, time
+from typing import Dict, List
+
+from backend.websocket_manager import ConnectionManager
+
+
+class FakeWebSocket:
+    """Accepts frames without I/O; send_json encodes the way Starlette does."""
+    def __init__(self, i: int):
+        self.client = ("127.0.0.1", 40000 + i)
+        self.frames = 0
+        self.bytes = 0
+
+    async def accept(self):
+        pass
+
+    async def close(self, code: int = 1000):
+        pass
+
+    async def send_text(self, data: str):
+        self.frames += 1
+        self.bytes += len(data)
+
+    async def send_json(self, data):
+        await self.send_text(json.dumps(data, separators=(",", ":"), ensure_ascii=False))
+
+
+class LegacyConnectionManager:
+    """Verbatim copy of the pre-queue broadcast loop (sequential send_json per client)."""
+    def __init__(self):
+        self.active: Dict[FakeWebSocket, float] = {}
+
+    def disconnect(self, websocket):
+        if websocket in self.active:
+            del self.active[websocket]
+
+    async def broadcast(self, message: dict):
+        print(f"Broadcasting message to {len(self.active)} clients: {message}")
+        dead: List[FakeWebSocket] = []
+        for ws in self.active:
+            try:
+                await ws.send_json(message)
+            except Exception as e:
+                print(f"Failed to broadcast to {ws.client}: {e}. Disconnecting.")
+                dead.append(ws)
+        for ws in dead:
+            self.disconnect(ws)
+
+
+def make_message(i: int) -> dict:
+    return {
+        "type": "traffic_monitor",
+        "title": "Traffic Monitor",
+        "payload": {"seq": i, "location": f"intersection-{i % 40}", "speed": 17.5 + i % 9,
+                    "congestion_level": "high", "vehicles": list(range(20))},
+    }
+
+
+async def bench_legacy(clients: int, n: int) -> float:
+    m = LegacyConnectionManager()
+    for i in range(clients):
+        m.active[FakeWebSocket(i)] = time.time()
+    sink = io.StringIO()
+    t0 = time.process_time()
+    with contextlib.redirect_stdout(sink):
+        for i in range(n):
+            await m.broadcast(make_message(i))
+    return (time.process_time() - t0) / n
+
+
+async def bench_current(clients: int, n: int, coalesce_ms: float = 0.0):
+    m = ConnectionManager(heartbeat_interval=3600, timeout=7200, send_queue_size=n + 1, coalesce_ms=coalesce_ms)
+    sockets = [FakeWebSocket(i) for i in range(clients)]
+    for ws in sockets:
+        await m.connect(ws)
+    t0 = time.process_time()
+    for i in range(n):
+        await m.broadcast(make_message(i))
+    while any(c.sent < n + 1 for c in m.active.values()):  # hello + n broadcasts; let every writer task drain
+        await asyncio.sleep(coalesce_ms / 1000.0)
+    elapsed = (time.process_time() - t0) / n
+    frames = sum(ws.frames for ws in sockets) / clients
+    assert coalesce_ms or frames == n + 1, "not every client received every frame"
+    for ws in sockets:
+        m.disconnect(ws)
+    return elapsed, frames
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--clients", type=int, default=1000)
+    ap.add_argument("--broadcasts", type=int, default=200)
+    ap.add_argument("--coalesce-ms", type=float, default=0.0)
+    args = ap.parse_args()
+    legacy = asyncio.run(bench_legacy(args.clients, args.broadcasts))
+    current, frames = asyncio.run(bench_current(args.clients, args.broadcasts, args.coalesce_ms))
+    print(f"clients={args.clients} broadcasts={args.broadcasts}")
+    print(f"legacy  : {legacy * 1000:.3f} ms CPU / broadcast")
+    print(f"current : {current * 1000:.3f} ms CPU / broadcast  (enqueue + writer delivery)")
+    print(f"speedup : {legacy / current:.2f}x")
+    print(f"frames  : {frames:.1f} per client for hello + {args.broadcasts} messages (coalesce_ms={args.coalesce_ms:g})")
+
+
+if __name__ == "__main__":
+    main()
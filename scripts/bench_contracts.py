@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""
+Microbenchmark: compiled Contract.validate vs the previous required-keys-only validate.
+用法:
+    PYTHONPATH=. python scripts/bench_contracts.py --n 20000
+"""
+
+import argparse, json, time
+from typing import Dict, List, Optional
+
+from core.contracts import Contract
+
+SCHEMA = {
+    "type": "object",
+    "required": ["kind", "severity", "zone", "action"],
+    "properties": {
+        "kind": {"type": "string", "enum": ["fall", "moisture", "traffic_incident"]},
+        "severity": {"type": "integer"},
+        "zone": {"type": "string", "pattern": r"^Z\d+$"},
+        "action": {
+            "type": "object",
+            "required": ["unit"],
+            "properties": {"unit": {"type": "string"}, "eta_min": {"type": "number"}},
+        },
+    },
+}
+
+OUTPUT = json.dumps({"kind": "fall", "severity": 2, "zone": "Z3", "action": {"unit": "ems", "eta_min": 4.5}})
+
+
+class LegacyContract:
+    """Verbatim copy of the pre-compilation Contract (top-level 'required' only)."""
+    def __init__(self, name: str, schema: Optional[Dict]=None, regex: Optional[str]=None):
+        self.name = name
+        self.schema = schema or {}
+        self.regex = None
+
+    def validate(self, text: str) -> bool:
+        req: List[str] = list(self.schema.get('required', []))
+        if req:
+            try:
+                obj = json.loads(text)
+                if not isinstance(obj, dict):
+                    return False
+                for k in req:
+                    if k not in obj:
+                        return False
+            except Exception:
+                return False
+        return True
+
+
+def _bench(label: str, fn, n: int):
+    t0 = time.perf_counter()
+    for _ in range(n):
+        fn()
+    dt = time.perf_counter() - t0
+    print(f"{label:<44} {dt*1e6/n:8.2f} us/op")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=20000)
+    args = ap.parse_args()
+
+    legacy = LegacyContract("legacy", schema=SCHEMA)
+    compiled = Contract("compiled", schema=SCHEMA)
+    assert legacy.validate(OUTPUT) and compiled.validate(OUTPUT) and compiled._validate(OUTPUT)
+
+    print(f"n={args.n}")
+    _bench("legacy validate (top-level required)", lambda: legacy.validate(OUTPUT), args.n)
+    # _validate skips the output memo: the same OUTPUT every time would only measure memo hits
+    _bench("compiled validate (full nested schema)", lambda: compiled._validate(OUTPUT), args.n)
+    _bench("compiled validate, memo hit (same output)", lambda: compiled.validate(OUTPUT), args.n)
+    # Many tasks sharing one schema: construction should hit the compiled-validator cache.
+    _bench("legacy construct+validate per task", lambda: LegacyContract("t", SCHEMA).validate(OUTPUT), args.n)
+    _bench("compiled construct+validate per task", lambda: Contract("t", SCHEMA).validate(OUTPUT), args.n)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,12 @@ from collections import defaultdict
 import matplotlib.pyplot as plt
 
 def load_events(path):
+    if not path.endswith(".csv"):
+        # events.arrow / events.parquet written by Metrics.write_arrow / write_parquet
+        from utils.event_store import read_events
+        df = read_events(path)
+        return [{"t_end": float(t), "latency_ms": float(l), "cache_hit": int(h)}
+                for t, l, h in zip(df["t_end"].values, df["latency_ms"].values, df["cache_hit"].values)]
     rows = []
     with open(path, "r") as f:
         r = csv.DictReader(f)
@@ -68,7 +74,7 @@ def plot_cache_hit_ma(events, out_png, window=20):
 
 def main():
     ap = argparse.ArgumentParser()
-    ap.add_argument("--events", required=True, help="path to events.csv")
+    ap.add_argument("--events", required=True, help="path to events.csv (or events.arrow / events.parquet)")
     ap.add_argument("--outdir", required=True)
     args = ap.parse_args()
     os.makedirs(args.outdir, exist_ok=True)
@@ -2,21 +2,26 @@
 """
 A/B runner: NoCache vs WithCache
 - 针对 scenario {city, ad}，各跑一遍，统一采集 events.csv / summary.csv
-- 无需修改 agents：用 monkeypatch 包裹 scheduler 执行，记录每个 Task 的延迟与缓存命中
+- 无需修改 agents：通过 SchedulerObserver 钩子记录每个 Task 的延迟与缓存命中
 - 默认写入:
     results/<scenario>_no_cache/{events.csv, summary.csv}
     results/<scenario>_with_cache/{events.csv, summary.csv}
 用法:
     PYTHONPATH=. python scripts/run_ab.py --scenario city --ticks 300 --seed 7
     PYTHONPATH=. python scripts/run_ab.py --scenario ad   --ticks 300 --seed 7
+录制/回放 LLM 调用（每个 run 一个 cassette：<dir>/<scenario>_{no,with}_cache.cassette）:
+    PYTHONPATH=. python scripts/run_ab.py --scenario city --record results/cassettes
+    PYTHONPATH=. python scripts/run_ab.py --scenario city --replay results/cassettes   # CPU 速度、输出一致
 """
 
-import os, sys, csv, time, argparse, math, json
+import os, csv, time, argparse, json, threading
 from datetime import datetime, timezone
-from typing import Tuple
 
 from dsl.dsl import DSL
 from runtime.radix_cache import RadixTrieCache
+from runtime.scheduler import SchedulerObserver
+from integrations.cassette import wrap_llm
+from utils.metrics import LatencyHistogram
 
 # 你的程序入口函数（agents 是“程序”，需要传 DSL 进去）
 from agents.smart_city import city_demo as _city_program
@@ -41,7 +46,50 @@ def _ensure_dir(d):
     os.makedirs(d, exist_ok=True)
 
 
-def _run_one(scenario:str, ticks:int, seed:int, outdir:str, use_cache:bool=True) -> dict:
+class _ABRecorder(SchedulerObserver):
+    """每个 Task 完成时写一行事件并累计汇总；延迟 = 出队到完成。"""
+    def __init__(self, scenario: str, ev: csv.DictWriter, summary: dict):
+        self.scenario = scenario
+        self.ev = ev
+        self.summary = summary
+        self.lat_hist = LatencyHistogram()
+        self.hits = 0
+        self._prefix = {}
+        self._lock = threading.Lock()
+
+    def on_cache_result(self, task, prefix_len, full_hit):
+        self._prefix[id(task)] = prefix_len
+
+    def on_complete(self, task, result, cache_hit):
+        tr = task.trace
+        t0 = int(tr.t_dequeue * 1e9)
+        t1 = int(tr.t_complete * 1e9)
+        latency_ms = (t1 - t0) / 1e6
+        prefix_len = self._prefix.pop(id(task), 0)
+        with self._lock:
+            # 事件行
+            self.ev.writerow({
+                "timestamp": datetime.now(timezone.utc).isoformat(),
+                "scenario": self.scenario,
+                "agent": getattr(task.agent, "role", task.agent),
+                "name": task.name,
+                "prompt_len": len(task.prompt),
+                "latency_ms": f"{latency_ms:.3f}",
+                "cache_hit": int(cache_hit),
+                "prefix_len": prefix_len
+            })
+            # 汇总
+            self.summary["count"] += 1
+            self.lat_hist.record(latency_ms)
+            if cache_hit:
+                self.hits += 1
+            if self.summary["t_first_ns"] is None:
+                self.summary["t_first_ns"] = t0
+            self.summary["t_last_ns"] = t1
+
+
+def _run_one(scenario:str, ticks:int, seed:int, outdir:str, use_cache:bool=True,
+             record:str|None=None, replay:str|None=None, replay_realtime:bool=False) -> dict:
     """
     运行一次场景，采集 events.csv 与 summary.csv，并返回汇总。
     """
@@ -54,18 +102,12 @@ def _run_one(scenario:str, ticks:int, seed:int, outdir:str, use_cache:bool=True)
     # 缓存开关：替换 dsl.cache
     dsl.cache = RadixTrieCache() if use_cache else _DummyNoopCache()
 
-    real_use_llm = dsl.use_llm
-    def _locked_use_llm(*args, **kwargs):
-        return  # 忽略一切覆盖请求（含 use_cache 等）
-    dsl.use_llm = _locked_use_llm  # type: ignore
-    llm = get_llm_with_fallback()
-    real_use_llm(llm)  # 设置一次
-
-
+    # pin=True：场景程序内部再调用 use_llm（含 use_cache 等）都会被忽略
+    llm = wrap_llm(get_llm_with_fallback(), record=record, replay=replay, realtime=replay_realtime)
+    dsl.use_llm(llm, pin=True)
 
-    # ---------- 指标打点：猴补丁 scheduler._execute_task ----------
+    # ---------- 指标打点：scheduler observer ----------
     scheduler = dsl.scheduler
-    orig_exec = scheduler._execute_task
 
     # 事件写入器
     f_ev = open(events_path, "w", newline="", encoding="utf-8")
@@ -90,48 +132,8 @@ def _run_one(scenario:str, ticks:int, seed:int, outdir:str, use_cache:bool=True)
         "throughput_eps": None,
         "hit_rate": None,
     }
-    lat_samples = []
-    hits = 0
-
-    def _patched_execute(task):
-        # 记录 cache 预判（完全命中时，scheduler 会直接返回）
-        prefix_len, hit_val = (0, None)
-        try:
-            prefix_len, hit_val = dsl.cache.get_with_lmp(task.prompt)
-        except Exception:
-            prefix_len, hit_val = 0, None
-        full_hit = 1 if (hit_val is not None and prefix_len == len(task.prompt)) else 0
-
-        t0 = time.perf_counter_ns()
-        try:
-            return orig_exec(task)
-        finally:
-            t1 = time.perf_counter_ns()
-            latency_ms = (t1 - t0) / 1e6
-
-            # 事件行
-            ev.writerow({
-                "timestamp": datetime.now(timezone.utc).isoformat(),
-                "scenario": scenario,
-                "agent": task.agent,
-                "name": task.name,
-                "prompt_len": len(task.prompt),
-                "latency_ms": f"{latency_ms:.3f}",
-                "cache_hit": full_hit,
-                "prefix_len": prefix_len
-            })
-
-            # 汇总
-            summary["count"] += 1
-            lat_samples.append(latency_ms)
-            if full_hit:
-                hits += 1
-            if summary["t_first_ns"] is None:
-                summary["t_first_ns"] = t0
-            summary["t_last_ns"] = t1
-
-    # 应用猴补丁
-    scheduler._execute_task = _patched_execute  # type: ignore
+    recorder = _ABRecorder(scenario, ev, summary)
+    dsl.add_observer(recorder)
 
     # ---------- 运行场景 ----------
     if scenario == "city":
@@ -151,16 +153,10 @@ def _run_one(scenario:str, ticks:int, seed:int, outdir:str, use_cache:bool=True)
     if summary["count"] > 0:
         dur_s = (summary["t_last_ns"] - summary["t_first_ns"]) / 1e9
         summary["throughput_eps"] = summary["count"] / max(1e-9, dur_s)
-        lat_sorted = sorted(lat_samples)
-        def _pct(p):
-            if not lat_sorted:
-                return None
-            k = max(0, min(len(lat_sorted)-1, int(math.ceil(p*len(lat_sorted)))-1))
-            return lat_sorted[k]
-        summary["p50_ms"] = _pct(0.50)
-        summary["p95_ms"] = _pct(0.95)
-        summary["p99_ms"] = _pct(0.99)
-        summary["hit_rate"] = hits / summary["count"]
+        summary["p50_ms"] = recorder.lat_hist.percentile(50)
+        summary["p95_ms"] = recorder.lat_hist.percentile(95)
+        summary["p99_ms"] = recorder.lat_hist.percentile(99)
+        summary["hit_rate"] = recorder.hits / summary["count"]
 
     with open(summary_path, "w", newline="", encoding="utf-8") as f_sum:
         w = csv.DictWriter(f_sum, fieldnames=list(summary.keys()))
@@ -177,17 +173,26 @@ def main():
     ap.add_argument("--ticks", type=int, default=300)
     ap.add_argument("--seed", type=int, default=7)
     ap.add_argument("--outbase", type=str, default="results")
+    ap.add_argument("--record", type=str, default=None, help="cassette directory to record LLM calls into")
+    ap.add_argument("--replay", type=str, default=None, help="cassette directory to replay LLM calls from")
+    ap.add_argument("--replay-realtime", action="store_true", help="sleep for the recorded latency on replay")
     args = ap.parse_args()
 
+    def _cassettes(tag):
+        name = f"{args.scenario}_{tag}.cassette"
+        return dict(record=os.path.join(args.record, name) if args.record else None,
+                    replay=os.path.join(args.replay, name) if args.replay else None,
+                    replay_realtime=args.replay_realtime)
+
     # 目录
     out_no = os.path.join(args.outbase, f"{args.scenario}_no_cache")
     out_yes = os.path.join(args.outbase, f"{args.scenario}_with_cache")
 
     print("=== RUN A (NoCache) ===")
-    _run_one(args.scenario, args.ticks, args.seed, out_no, use_cache=False)
+    _run_one(args.scenario, args.ticks, args.seed, out_no, use_cache=False, **_cassettes("no_cache"))
 
     print("=== RUN B (WithCache) ===")
-    _run_one(args.scenario, args.ticks, args.seed, out_yes, use_cache=True)
+    _run_one(args.scenario, args.ticks, args.seed, out_yes, use_cache=True, **_cassettes("with_cache"))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,26 @@
+# tests/test_contracts.py
+from core.contracts import Contract, compile_schema
+
+
+def test_integer_accepts_integral_floats():
+    check = compile_schema({"type": "integer"})
+    assert check(1) and check(1.0) and check(-3.0)
+    assert not check(1.5)
+    assert not check(float("inf")) and not check(float("nan"))
+    assert not check(True) and not check(False)
+    assert not check("1")
+
+
+def test_contract_integer_field():
+    c = Contract("count", schema={"type": "object", "properties": {"n": {"type": "integer"}}, "required": ["n"]})
+    assert c.validate('{"n": 2}')
+    assert c.validate('{"n": 2.0}')
+    assert not c.validate('{"n": 2.5}')
+    assert not c.validate('{"n": true}')
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_"):
+            fn()
+            print("ok", name)
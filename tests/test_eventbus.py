@@ -0,0 +1,53 @@
+# tests/test_eventbus.py
+import tempfile, threading, time
+
+from runtime.eventbus import EventBus
+
+
+def _gated(bus):
+    """Subscriber that blocks on its first event until released, so the queue backs up."""
+    seen, entered, release = [], threading.Event(), threading.Event()
+
+    def fn(payload):
+        entered.set()
+        release.wait(5)
+        seen.append(payload)
+    bus.subscribe("t", fn)
+    return seen, entered, release
+
+
+def test_spill_keeps_publish_order():
+    with tempfile.TemporaryDirectory() as d:
+        bus = EventBus(max_queue=2, overflow="spill", spill_dir=d)
+        seen, entered, release = _gated(bus)
+        for i in range(50):
+            assert bus.publish("t", i)
+        release.set()
+        bus.join()
+        stats = bus.stats()
+        bus.shutdown()
+    assert seen == list(range(50))
+    assert stats["outcomes"]["spilled"] > 0 and stats["replayed"] == stats["outcomes"]["spilled"]
+    assert stats["dropped"] == 0
+
+
+def test_drop_oldest_keeps_newest():
+    bus = EventBus(max_queue=3, overflow="drop_oldest")
+    seen, entered, release = _gated(bus)
+    bus.publish("t", 0)
+    assert entered.wait(5)  # worker holds event 0, the queue is empty
+    for i in range(1, 11):
+        assert bus.publish("t", i)
+    release.set()
+    bus.join()
+    stats = bus.stats()
+    bus.shutdown()
+    assert seen == [0, 8, 9, 10]
+    assert stats["outcomes"]["dropped_oldest"] == 7
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_"):
+            fn()
+            print("ok", name)
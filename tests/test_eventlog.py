@@ -0,0 +1,57 @@
+# tests/test_eventlog.py
+import os, tempfile
+
+from runtime.eventlog import EventLogLocked, EventLogReader, EventLogWriter, encode_record, open_worker_log
+
+
+def _write(d, n):
+    w = EventLogWriter(d)
+    for i in range(n):
+        w.append("t", {"i": i})
+    w.close()
+
+
+def test_torn_tail_is_truncated():
+    with tempfile.TemporaryDirectory() as d:
+        _write(d, 5)
+        (seg,) = [os.path.join(d, n) for n in os.listdir(d) if n.endswith(".seg")]
+        good = os.path.getsize(seg)
+        with open(seg, "ab") as f:  # a crash mid-write: half a record at the tail
+            f.write(encode_record(5, 0.0, "t", 0, b'{"i":5}')[:-3])
+        assert [r.seq for r in EventLogReader(d)] == [0, 1, 2, 3, 4]
+        w = EventLogWriter(d)
+        assert w.next_seq == 5 and os.path.getsize(seg) == good
+        w.append("t", {"i": 5})
+        w.close()
+        assert [r.payload["i"] for r in EventLogReader(d)] == [0, 1, 2, 3, 4, 5]
+
+
+def test_second_writer_is_locked_out():
+    with tempfile.TemporaryDirectory() as d:
+        w = EventLogWriter(d)
+        try:
+            EventLogWriter(d)
+        except EventLogLocked:
+            pass
+        else:
+            raise AssertionError("second writer opened a locked log")
+        w.close()
+        EventLogWriter(d).close()  # released on close
+
+
+def test_worker_logs_skip_locked_dirs():
+    with tempfile.TemporaryDirectory() as root:
+        a, b = open_worker_log(root), open_worker_log(root)
+        assert (os.path.basename(a.dirpath), os.path.basename(b.dirpath)) == ("worker-0", "worker-1")
+        a.close()
+        c = open_worker_log(root)
+        assert os.path.basename(c.dirpath) == "worker-0"
+        b.close()
+        c.close()
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_"):
+            fn()
+            print("ok", name)
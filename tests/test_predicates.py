@@ -0,0 +1,50 @@
+# tests/test_predicates.py
+from runtime.predicates import PredicateIndex, Range
+
+
+def _index(**where):
+    idx = PredicateIndex()
+    for name, cond in where.items():
+        idx.add(name, {"v": cond})
+    return idx
+
+
+def test_numeric_and_string_ranges_coexist():
+    idx = _index(slow=Range.lt(20), band=Range.between(5, 10), ab=Range("a", "c"), upto_m=Range.lt("m"))
+    assert idx.select({"v": 7}) == ["slow", "band"]
+    assert idx.select({"v": 7.5}) == ["slow", "band"]
+    assert idx.select({"v": "b"}) == ["ab", "upto_m"]
+    assert idx.select({"v": "x"}) == []
+
+
+def test_incomparable_values_match_nothing():
+    idx = _index(slow=Range.lt(20), ab=Range("a", "c"))
+    assert idx.select({"v": None}) == []
+    assert idx.select({"v": [1]}) == []
+    assert idx.select({"v": {"k": 1}}) == []
+    assert idx.select({"v": (1, "a")}) == []
+
+
+def test_bad_bounds_rejected_at_registration():
+    for lo, hi in ((1, "z"), ("a", 5), ({}, None), (None, object())):
+        try:
+            Range(lo, hi)
+        except ValueError:
+            continue
+        raise AssertionError(f"Range({lo!r}, {hi!r}) accepted")
+
+
+def test_remove_drops_empty_partitions():
+    idx = PredicateIndex()
+    idx.add("num", {"v": Range.ge(0)})
+    idx.add("txt", {"v": Range.ge("a")})
+    assert idx.remove("num") and idx.select({"v": 1}) == []
+    assert idx.select({"v": "b"}) == ["txt"]
+    assert idx.remove("txt") and len(idx) == 0
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_"):
+            fn()
+            print("ok", name)
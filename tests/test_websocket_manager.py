@@ -0,0 +1,63 @@
+# tests/test_websocket_manager.py
+import asyncio, json
+
+from backend.websocket_manager import ConnectionManager
+
+
+class _FakeSocket:
+    def __init__(self, **params):
+        self.query_params = {k: str(v) for k, v in params.items()}
+        self.client = "test"
+        self.sent = []
+
+    async def accept(self, subprotocol=None):
+        pass
+
+    async def send_text(self, text):
+        self.sent.append(json.loads(text))
+
+    async def close(self, code=None):
+        pass
+
+
+async def _connect(manager, **params):
+    ws = _FakeSocket(**params)
+    await manager.connect(ws)
+    await asyncio.sleep(0.01)  # let the writer drain the handshake
+    manager.disconnect(ws)
+    return ws.sent
+
+
+async def _resume_then_resync():
+    manager = ConnectionManager(heartbeat_interval=60, replay_size=4)
+    for i in range(3):
+        manager.broadcast_frame(json.dumps({"type": "a", "payload": i}), topic="a")
+    resumed = await _connect(manager, epoch=manager.epoch, resume_from=1)
+    for i in range(3, 10):  # pushes seq 2..6 out of topic a's 4-message buffer
+        manager.broadcast_frame(json.dumps({"type": "a", "payload": i}), topic="a")
+    evicted = await _connect(manager, epoch=manager.epoch, resume_from=1)
+    edge = await _connect(manager, epoch=manager.epoch, resume_from=6)  # 7..10 still buffered
+    restarted = await _connect(manager, epoch="other", resume_from=9)
+    manager._heartbeat_task.cancel()
+    return resumed, evicted, edge, restarted, manager.stats()
+
+
+def test_resume_vs_resync_on_eviction():
+    resumed, evicted, edge, restarted, stats = asyncio.run(_resume_then_resync())
+    hello, batch = resumed
+    assert hello["payload"] == {"epoch": hello["payload"]["epoch"], "seq": 3, "resumed_from": 1, "replayed": 2}
+    assert batch["type"] == "batch" and [m["seq"] for m in batch["payload"]] == [2, 3]
+    (hello,) = evicted
+    assert hello["payload"]["resync"] is True and hello["payload"]["seq"] == 10
+    hello, batch = edge
+    assert hello["payload"]["replayed"] == 4 and [m["seq"] for m in batch["payload"]] == [7, 8, 9, 10]
+    (hello,) = restarted
+    assert hello["payload"]["resync"] is True
+    assert stats["resumed"] == 2 and stats["resyncs"] == 2 and stats["replay_buffered"] == 4
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_"):
+            fn()
+            print("ok", name)
@@ -0,0 +1,73 @@
+from __future__ import annotations
+from bisect import bisect_left
+from typing import List, Sequence, Tuple
+import threading
+
+class ShardedCounter:
+    """
+    Counter/gauge with one cell per writer thread: add() touches only the calling
+    thread's cell (no lock, no contention), value() sums all cells. Negative deltas
+    are allowed, so it also serves as an up/down gauge.
+    """
+    def __init__(self):
+        self._local = threading.local()
+        self._cells: List[List[float]] = []
+        self._reg_lock = threading.Lock()
+
+    def _cell(self) -> List[float]:
+        cell = getattr(self._local, "cell", None)
+        if cell is None:
+            cell = [0]
+            with self._reg_lock:  # once per thread
+                self._cells.append(cell)
+            self._local.cell = cell
+        return cell
+
+    def add(self, n: float = 1):
+        self._cell()[0] += n
+
+    def value(self) -> float:
+        return sum(c[0] for c in self._cells)
+
+# Prometheus-style latency buckets in milliseconds
+DEFAULT_MS_BUCKETS: Tuple[float, ...] = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+class ShardedHistogram:
+    """
+    Fixed-bucket histogram with per-thread cells, exported in Prometheus form
+    (cumulative bucket counts, sum, count). observe() is lock-free after a thread's first call.
+    """
+    def __init__(self, buckets: Sequence[float] = DEFAULT_MS_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._local = threading.local()
+        self._cells: List[List[float]] = []  # per thread: [count per bucket..., +Inf count, sum]
+        self._reg_lock = threading.Lock()
+
+    def _cell(self) -> List[float]:
+        cell = getattr(self._local, "cell", None)
+        if cell is None:
+            cell = [0] * (len(self.buckets) + 2)
+            with self._reg_lock:
+                self._cells.append(cell)
+            self._local.cell = cell
+        return cell
+
+    def observe(self, value: float):
+        cell = self._cell()
+        cell[bisect_left(self.buckets, value)] += 1
+        cell[-1] += value
+
+    def snapshot(self) -> Tuple[List[Tuple[float, int]], float, int]:
+        """([(upper bound, cumulative count)...] incl. +Inf, sum, count)."""
+        n = len(self.buckets) + 1
+        counts = [0] * n
+        total = 0.0
+        for cell in list(self._cells):
+            for i in range(n):
+                counts[i] += cell[i]
+            total += cell[-1]
+        cum, out = 0, []
+        for bound, c in zip(self.buckets + (float("inf"),), counts):
+            cum += c
+            out.append((bound, cum))
+        return out, total, cum
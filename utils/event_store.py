@@ -0,0 +1,110 @@
+from __future__ import annotations
+from array import array
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import os
+
+# (column name, array typecode, CSV format)
+EVENT_COLUMNS: Tuple[Tuple[str, str, Optional[str]], ...] = (
+    ("t_end", "d", "{:.6f}"),
+    ("latency_ms", "d", "{:.3f}"),
+    ("cache_hit", "b", None),
+)
+
+class ColumnarEventBuffer:
+    """
+    Append-only columnar store for per-task metrics events, backed by typed arrays.
+    Chunks are preallocated to `chunk_size` rows and never resized, so exports can hand
+    their buffers to Arrow/NumPy without copying. Not thread-safe on its own.
+    """
+    def __init__(self, columns: Tuple[Tuple[str, str, Optional[str]], ...] = EVENT_COLUMNS, chunk_size: int = 16384):
+        self.columns = columns
+        self.chunk_size = max(1, int(chunk_size))
+        self._chunks: Dict[str, List[array]] = {name: [] for name, *_ in columns}
+        self._n = 0
+
+    def _grow(self):
+        for name, code, _ in self.columns:
+            self._chunks[name].append(array(code, bytes(array(code).itemsize * self.chunk_size)))
+
+    def append(self, *values):
+        i = self._n % self.chunk_size
+        if i == 0:
+            self._grow()
+        for (name, *_), v in zip(self.columns, values):
+            self._chunks[name][-1][i] = v
+        self._n += 1
+
+    def __len__(self) -> int:
+        return self._n
+
+    def iter_chunks(self, name: str) -> Iterator[memoryview]:
+        """Zero-copy views of the filled part of each chunk of one column."""
+        n = self._n
+        for chunk in self._chunks[name]:
+            if n <= 0:
+                break
+            k = min(n, self.chunk_size)
+            yield memoryview(chunk)[:k]
+            n -= k
+
+    def column(self, name: str) -> array:
+        """One contiguous copy of a column."""
+        code = next(c for n, c, _ in self.columns if n == name)
+        out = array(code)
+        for view in self.iter_chunks(name):
+            out.frombytes(view.tobytes())
+        return out
+
+    def rows(self) -> Iterator[tuple]:
+        cols = [self.column(name) for name, *_ in self.columns]
+        return zip(*cols)
+
+    # ---------- exporters ----------
+    def to_arrow(self):
+        """pyarrow.Table whose columns reference the chunk buffers directly (no copy)."""
+        import pyarrow as pa
+        types = {"d": pa.float64(), "b": pa.int8(), "q": pa.int64(), "i": pa.int32()}
+        arrays = []
+        for name, code, _ in self.columns:
+            pieces = [pa.Array.from_buffers(types[code], len(v), [None, pa.py_buffer(v)])
+                      for v in self.iter_chunks(name)]
+            arrays.append(pa.chunked_array(pieces, type=types[code]))
+        return pa.Table.from_arrays(arrays, names=[name for name, *_ in self.columns])
+
+    def write_arrow(self, path: str):
+        """Arrow IPC file; read back zero-copy with read_events()."""
+        import pyarrow as pa
+        table = self.to_arrow()
+        with pa.OSFile(path, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+
+    def write_parquet(self, path: str):
+        import pyarrow.parquet as pq
+        pq.write_table(self.to_arrow(), path)
+
+    def write_csv(self, path: str):
+        import csv
+        with open(path, "w", newline="") as f:
+            w = csv.writer(f)
+            w.writerow([name for name, *_ in self.columns])
+            cols = [map(fmt.format, self.column(name)) if fmt else self.column(name)
+                    for name, _, fmt in self.columns]
+            w.writerows(zip(*cols))
+
+def read_events(path: str) -> Any:
+    """
+    Load an events file into a pandas DataFrame. `.arrow`/`.feather` files are
+    memory-mapped instead of parsed, `.parquet` goes through pyarrow, anything
+    else is read as CSV.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext in (".arrow", ".feather", ".ipc"):
+        import pyarrow as pa
+        with pa.memory_map(path, "r") as source:
+            table = pa.ipc.open_file(source).read_all()
+        return table.to_pandas()
+    if ext == ".parquet":
+        import pyarrow.parquet as pq
+        return pq.read_table(path, memory_map=True).to_pandas()
+    import pandas as pd
+    return pd.read_csv(path)
@@ -1,23 +1,158 @@
 
 from __future__ import annotations
-from dataclasses import dataclass
-from typing import List, Dict, Any
-import threading, time, csv, os
+from typing import List, Dict, Any, Optional, Tuple
+import threading, time, csv, os, math
 
-@dataclass
-class MetricsEvent:
-    t_end: float
-    latency_ms: float
-    cache_hit: bool
+from utils.event_store import ColumnarEventBuffer
+
+class LatencyHistogram:
+    """
+    HDR-style log-bucketed latency histogram: each power of two (in microseconds) is split
+    into `sub_buckets` linear slots, so relative error is <= 1/sub_buckets.
+    record() is O(1), percentile() is O(buckets); memory is fixed regardless of sample count.
+    Not thread-safe on its own; callers hold their own lock.
+    """
+    __slots__ = ("sub_buckets", "max_exp", "counts", "count", "total_ms", "min_ms", "max_ms")
+
+    def __init__(self, sub_buckets: int = 64, max_exp: int = 40):
+        self.sub_buckets = sub_buckets
+        self.max_exp = max_exp  # 2**40 us ~= 12.7 days
+        self.counts = [0] * ((max_exp + 1) * sub_buckets)
+        self.count = 0
+        self.total_ms = 0.0
+        self.min_ms = math.inf
+        self.max_ms = 0.0
+
+    def _index(self, ms: float) -> int:
+        us = ms * 1000.0
+        if us < 1.0:
+            return 0
+        m, e = math.frexp(us)  # us = m * 2**e, m in [0.5, 1)
+        if e > self.max_exp:
+            return len(self.counts) - 1
+        return e * self.sub_buckets + int((m - 0.5) * 2 * self.sub_buckets)
+
+    def _value_ms(self, idx: int) -> float:
+        e, sub = divmod(idx, self.sub_buckets)
+        if e == 0:
+            return 0.0
+        lo = (0.5 + sub / (2.0 * self.sub_buckets)) * (2.0 ** e)
+        hi = (0.5 + (sub + 1) / (2.0 * self.sub_buckets)) * (2.0 ** e)
+        return (lo + hi) / 2000.0
+
+    def record(self, ms: float):
+        self.counts[self._index(ms)] += 1
+        self.count += 1
+        self.total_ms += ms
+        if ms < self.min_ms:
+            self.min_ms = ms
+        if ms > self.max_ms:
+            self.max_ms = ms
+
+    def merge(self, other: "LatencyHistogram"):
+        for i, c in enumerate(other.counts):
+            if c:
+                self.counts[i] += c
+        self.count += other.count
+        self.total_ms += other.total_ms
+        self.min_ms = min(self.min_ms, other.min_ms)
+        self.max_ms = max(self.max_ms, other.max_ms)
+
+    def percentile(self, p: float) -> Optional[float]:
+        """Value at percentile p (0-100), clamped to the observed min/max; None when empty."""
+        if not self.count:
+            return None
+        target = max(1, int(math.ceil(p / 100.0 * self.count)))
+        seen = 0
+        for i, c in enumerate(self.counts):
+            if c:
+                seen += c
+                if seen >= target:
+                    return min(max(self._value_ms(i), self.min_ms), self.max_ms)
+        return self.max_ms
+
+    def mean(self) -> float:
+        return (self.total_ms / self.count) if self.count else 0.0
+
+    def reset(self):
+        if self.count:
+            self.counts = [0] * len(self.counts)
+        self.count = 0
+        self.total_ms = 0.0
+        self.min_ms = math.inf
+        self.max_ms = 0.0
+
+class RollingWindow:
+    """
+    Sliding window over the last `span_s` seconds as a ring of `slots` buckets, each
+    holding completions, cache hits and a small latency histogram. A bucket is recycled
+    when time wraps around to it, so memory is fixed and no per-event timestamps are kept.
+    Not thread-safe on its own; callers hold their own lock.
+    """
+    def __init__(self, span_s: float, slots: int):
+        self.span_s = span_s
+        self.slots = slots
+        self.resolution_s = span_s / slots
+        self._tick = [-1] * slots
+        self._count = [0] * slots
+        self._hits = [0] * slots
+        self._hist = [LatencyHistogram(sub_buckets=16, max_exp=32) for _ in range(slots)]
+
+    def record(self, now: float, latency_ms: float, cache_hit: bool):
+        tick = int(now // self.resolution_s)
+        i = tick % self.slots
+        if self._tick[i] != tick:
+            self._tick[i] = tick
+            self._count[i] = 0
+            self._hits[i] = 0
+            self._hist[i].reset()
+        self._count[i] += 1
+        if cache_hit:
+            self._hits[i] += 1
+        self._hist[i].record(latency_ms)
+
+    def snapshot(self, now: float) -> Dict[str, Any]:
+        tick = int(now // self.resolution_s)
+        merged = LatencyHistogram(sub_buckets=16, max_exp=32)
+        count = hits = 0
+        for i in range(self.slots):
+            if 0 <= tick - self._tick[i] < self.slots and self._count[i]:
+                count += self._count[i]
+                hits += self._hits[i]
+                merged.merge(self._hist[i])
+        return {
+            "completed": count,
+            "throughput_per_s": count / self.span_s,
+            "cache_hit_rate": (hits / count) if count else 0.0,
+            "p50_latency_ms": merged.percentile(50),
+            "p95_latency_ms": merged.percentile(95),
+            "p99_latency_ms": merged.percentile(99),
+        }
+
+# name -> (span seconds, ring slots)
+ROLLING_WINDOWS: Dict[str, Tuple[float, int]] = {"1s": (1.0, 10), "1m": (60.0, 60), "5m": (300.0, 60)}
+
+PHASES = ("queue_wait", "cache_lookup", "llm", "validation", "backoff", "total")
 
 class Metrics:
-    """Thread-safe metrics recorder for Scheduler. CSV-friendly export."""
-    def __init__(self):
+    """
+    Thread-safe metrics recorder for Scheduler. CSV-friendly export.
+    Latency percentiles come from a fixed-size histogram; per-task events are kept
+    only when keep_events=True (needed for events.csv).
+    """
+    def __init__(self, keep_events: bool = True):
         self._lock = threading.RLock()
-        self.events: List[MetricsEvent] = []
+        self.keep_events = keep_events
+        self.events = ColumnarEventBuffer()
+        self.latency = LatencyHistogram()
         self.task_started = 0
         self.task_completed = 0
         self.cache_hits_full = 0
+        self.repair_attempts = 0
+        self.repair_successes = 0
+        # (agent role, task name) -> phase -> histogram
+        self.phases: Dict[Tuple[str, str], Dict[str, LatencyHistogram]] = {}
+        self.windows = {name: RollingWindow(span, slots) for name, (span, slots) in ROLLING_WINDOWS.items()}
 
     def on_submit(self):
         with self._lock:
@@ -28,31 +163,91 @@ class Metrics:
             self.task_completed += 1
             if cache_hit:
                 self.cache_hits_full += 1
-            self.events.append(MetricsEvent(time.time(), latency_ms, cache_hit))
+            self.latency.record(latency_ms)
+            now = time.monotonic()
+            for w in self.windows.values():
+                w.record(now, latency_ms, cache_hit)
+            if self.keep_events:
+                self.events.append(time.time(), latency_ms, 1 if cache_hit else 0)
+
+    def on_trace(self, role: Any, name: str, trace):
+        """Fold one finished runtime.scheduler.TaskTrace into the per-role/task phase breakdown."""
+        durations = trace.phases_ms()
+        key = (str(role), name)
+        with self._lock:
+            hists = self.phases.get(key)
+            if hists is None:
+                hists = self.phases[key] = {p: LatencyHistogram(sub_buckets=16) for p in PHASES}
+            for p in PHASES:
+                hists[p].record(durations[p])
+
+    def phase_breakdown(self) -> List[Dict[str, Any]]:
+        """One row per (role, task name): count plus mean/p95 ms of every phase."""
+        rows = []
+        with self._lock:
+            for (role, name), hists in sorted(self.phases.items()):
+                row: Dict[str, Any] = {"agent": role, "name": name, "count": hists["total"].count}
+                for p in PHASES:
+                    row[f"{p}_mean_ms"] = round(hists[p].mean(), 3)
+                    p95 = hists[p].percentile(95)
+                    row[f"{p}_p95_ms"] = round(p95, 3) if p95 is not None else None
+                rows.append(row)
+        return rows
+
+    def rolling(self) -> Dict[str, Dict[str, Any]]:
+        """Throughput, hit rate and latency percentiles over each of ROLLING_WINDOWS, ending now."""
+        now = time.monotonic()
+        with self._lock:
+            return {name: w.snapshot(now) for name, w in self.windows.items()}
+
+    def on_repair(self, success: bool):
+        with self._lock:
+            self.repair_attempts += 1
+            if success:
+                self.repair_successes += 1
 
     def to_dict(self) -> Dict[str, Any]:
         with self._lock:
             total = self.task_completed
             hit_rate = (self.cache_hits_full / total) if total else 0.0
-            avg_latency = (sum(e.latency_ms for e in self.events) / total) if total else 0.0
+            avg_latency = self.latency.mean()
+            repair_rate = (self.repair_successes / self.repair_attempts) if self.repair_attempts else 0.0
             return {
                 "task_started": self.task_started,
                 "task_completed": total,
                 "cache_hit_rate": hit_rate,
                 "avg_latency_ms": avg_latency,
+                "p50_latency_ms": self.latency.percentile(50),
+                "p95_latency_ms": self.latency.percentile(95),
+                "p99_latency_ms": self.latency.percentile(99),
+                "repair_attempts": self.repair_attempts,
+                "repair_success_rate": repair_rate,
             }
 
     def write_csv(self, outdir: str):
         os.makedirs(outdir, exist_ok=True)
-        path = os.path.join(outdir, "events.csv")
-        with self._lock, open(path, "w", newline="") as f:
-            w = csv.writer(f)
-            w.writerow(["t_end", "latency_ms", "cache_hit"])
-            for e in self.events:
-                w.writerow([f"{e.t_end:.6f}", f"{e.latency_ms:.3f}", int(e.cache_hit)])
+        with self._lock:
+            self.events.write_csv(os.path.join(outdir, "events.csv"))
+        rows = self.phase_breakdown()
+        if rows:
+            with open(os.path.join(outdir, "phases.csv"), "w", newline="") as f:
+                w = csv.DictWriter(f, fieldnames=list(rows[0].keys()))
+                w.writeheader()
+                w.writerows(rows)
         s = self.to_dict()
         path2 = os.path.join(outdir, "summary.csv")
         with open(path2, "w", newline="") as f:
             w = csv.writer(f)
             w.writerow(list(s.keys()))
             w.writerow(list(s.values()))
+
+    def write_arrow(self, outdir: str):
+        """events.arrow (Arrow IPC), loadable zero-parse via utils.event_store.read_events."""
+        os.makedirs(outdir, exist_ok=True)
+        with self._lock:
+            self.events.write_arrow(os.path.join(outdir, "events.arrow"))
+
+    def write_parquet(self, outdir: str):
+        os.makedirs(outdir, exist_ok=True)
+        with self._lock:
+            self.events.write_parquet(os.path.join(outdir, "events.parquet"))